@@ -0,0 +1,233 @@
+#analytics of how the prices, ratings and listings of each location change over time, built from the scrapes kept in the property database
+#each scrape is summarised once when it is saved and the running totals of its location are updated, so past scrapes never have to be read again
+#this module only uses the database, so TravelPropertyAnalysis can import it without importing itself again - TravelPropertyAnalysis is only imported to open a database from the command line
+import argparse
+import json
+import math
+import statistics
+
+#the database the scrapes are stored in by TravelPropertyAnalysis
+STORE_FILENAME = "property_data.db"
+#the width of each band of average ratings in the rating distribution
+RATING_BIN_WIDTH = 0.25
+
+#the tables of the analytics - scrape_summaries holds the statistics of each scrape and location_summaries the running totals of each location
+ANALYTICS_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scrape_summaries (
+    scrape_id INTEGER PRIMARY KEY REFERENCES scrapes (id),
+    location TEXT NOT NULL COLLATE NOCASE,
+    scraped_at TEXT NOT NULL,
+    properties INTEGER NOT NULL,
+    priced INTEGER NOT NULL,
+    mean_price REAL,
+    median_price REAL,
+    min_price REAL,
+    max_price REAL,
+    rated INTEGER NOT NULL,
+    mean_rating REAL,
+    rating_bins TEXT NOT NULL,
+    new_listings INTEGER,
+    gone_listings INTEGER
+);
+CREATE INDEX IF NOT EXISTS scrape_summaries_location_time ON scrape_summaries (location, scraped_at);
+CREATE TABLE IF NOT EXISTS location_summaries (
+    location TEXT PRIMARY KEY COLLATE NOCASE,
+    scrapes INTEGER NOT NULL,
+    first_scraped_at TEXT NOT NULL,
+    last_scraped_at TEXT NOT NULL,
+    last_scrape_id INTEGER NOT NULL,
+    properties_total INTEGER NOT NULL,
+    priced_total INTEGER NOT NULL,
+    price_total REAL NOT NULL,
+    rated_total INTEGER NOT NULL,
+    rating_total REAL NOT NULL,
+    rating_bins TEXT NOT NULL,
+    new_total INTEGER NOT NULL,
+    gone_total INTEGER NOT NULL
+);
+"""
+
+#function that creates the analytics tables in an open property database if they do not exist yet
+def create_analytics_tables(connection):
+    connection.executescript(ANALYTICS_SCHEMA)
+
+#function that opens a property database written by TravelPropertyAnalysis with the analytics tables ready to be read
+#the database is opened by TravelPropertyAnalysis so one created by an older version is brought up to date first
+def open_analytics(filename=STORE_FILENAME):
+    import TravelPropertyAnalysis
+    connection = TravelPropertyAnalysis.open_store(filename)
+    create_analytics_tables(connection)
+    return connection
+
+#function that returns the band of the rating distribution an average rating falls in, e.g. 4.87 is in the "4.75" band
+def get_rating_bin(rating):
+    return f"{math.floor(rating / RATING_BIN_WIDTH) * RATING_BIN_WIDTH:.2f}"
+
+#function that returns the prices and average ratings of the properties seen in a scrape - every scrape stores all of its properties
+def get_scrape_values(connection, scrape_id):
+    return connection.execute("SELECT price_per_night, average_rating FROM properties WHERE scrape_id = ?", (scrape_id,)).fetchall()
+
+#function that works out the statistics of one scrape from its own properties - missing prices and ratings (NULL or 0) are left out
+def summarise_scrape(values):
+    prices = [price for price, rating in values if price]
+    ratings = [rating for price, rating in values if rating]
+
+    rating_bins = {}
+    for rating in ratings:
+        rating_bin = get_rating_bin(rating)
+        rating_bins[rating_bin] = rating_bins.get(rating_bin, 0) + 1
+
+    return {
+        "properties": len(values),
+        "priced": len(prices),
+        "mean_price": statistics.fmean(prices) if prices != [] else None,
+        "median_price": statistics.median(prices) if prices != [] else None,
+        "min_price": min(prices, default=None),
+        "max_price": max(prices, default=None),
+        "rated": len(ratings),
+        "mean_rating": statistics.fmean(ratings) if ratings != [] else None,
+        "rating_bins": rating_bins,
+    }
+
+#function that adds a finished scrape to the analytics - its statistics are saved and the running totals of its location are updated
+#only the scrape itself and the listings seen in it are read, so this takes as long with months of scrapes stored as with one
+#churn is measured against the scrape recorded before it, so scrapes are recorded as they finish, before the next scrape of the location
+#(scrapes recorded later by backfill only have the right churn if no newer scrape of their location has been saved since)
+#a scrape that has already been recorded is skipped - returns True if the scrape was recorded
+def record_scrape(connection, scrape_id):
+    create_analytics_tables(connection)
+    if connection.execute("SELECT 1 FROM scrape_summaries WHERE scrape_id = ?", (scrape_id,)).fetchone() is not None:
+        return False
+
+    travel_location, scraped_at = connection.execute("SELECT location, scraped_at FROM scrapes WHERE id = ?", (scrape_id,)).fetchone()
+    summary = summarise_scrape(get_scrape_values(connection, scrape_id))
+
+    location_summary = connection.execute(
+        "SELECT last_scrape_id, rating_bins FROM location_summaries WHERE location = ?",
+        (travel_location,),
+    ).fetchone()
+
+    #listings first seen in this scrape are new, and listings last seen in the scrape before it are gone
+    #listings are matched by the id of the scrape rather than its time, as two scrapes can be saved in the same second
+    #scrapes that did not add any listings to the listing index (such as ones migrated from excel) have no churn
+    has_listing_ids = connection.execute("SELECT 1 FROM listings WHERE location = ? AND last_seen_scrape_id = ? LIMIT 1", (travel_location, scrape_id)).fetchone() is not None
+    new_listings = None
+    gone_listings = None
+    if has_listing_ids:
+        new_listings = connection.execute("SELECT COUNT(*) FROM listings WHERE location = ? AND first_seen_scrape_id = ?", (travel_location, scrape_id)).fetchone()[0]
+        if location_summary is not None:
+            gone_listings = connection.execute("SELECT COUNT(*) FROM listings WHERE location = ? AND last_seen_scrape_id = ?", (travel_location, location_summary[0])).fetchone()[0]
+
+    with connection:
+        connection.execute(
+            "INSERT INTO scrape_summaries (scrape_id, location, scraped_at, properties, priced, mean_price, median_price, min_price, max_price, rated, mean_rating, rating_bins, new_listings, gone_listings) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (scrape_id, travel_location, scraped_at, summary["properties"], summary["priced"], summary["mean_price"], summary["median_price"], summary["min_price"],
+             summary["max_price"], summary["rated"], summary["mean_rating"], json.dumps(summary["rating_bins"], sort_keys=True), new_listings, gone_listings),
+        )
+
+        price_total = summary["mean_price"] * summary["priced"] if summary["priced"] > 0 else 0.0
+        rating_total = summary["mean_rating"] * summary["rated"] if summary["rated"] > 0 else 0.0
+        if location_summary is None:
+            connection.execute(
+                "INSERT INTO location_summaries (location, scrapes, first_scraped_at, last_scraped_at, last_scrape_id, properties_total, priced_total, price_total, rated_total, rating_total, rating_bins, new_total, gone_total) "
+                "VALUES (?, 1, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, 0)",
+                (travel_location, scraped_at, scraped_at, scrape_id, summary["properties"], summary["priced"], price_total, summary["rated"], rating_total,
+                 json.dumps(summary["rating_bins"], sort_keys=True), new_listings or 0),
+            )
+        else:
+            #the rating distribution of the location is the sum of the distributions of its scrapes
+            rating_bins = json.loads(location_summary[1])
+            for rating_bin, count in summary["rating_bins"].items():
+                rating_bins[rating_bin] = rating_bins.get(rating_bin, 0) + count
+
+            #the latest scrape is only moved on if this scrape is newer, e.g. not an old one imported from excel
+            connection.execute(
+                "UPDATE location_summaries SET scrapes = scrapes + 1, "
+                "first_scraped_at = MIN(first_scraped_at, ?), "
+                "last_scrape_id = CASE WHEN ? >= last_scraped_at THEN ? ELSE last_scrape_id END, "
+                "last_scraped_at = MAX(last_scraped_at, ?), "
+                "properties_total = properties_total + ?, priced_total = priced_total + ?, price_total = price_total + ?, "
+                "rated_total = rated_total + ?, rating_total = rating_total + ?, rating_bins = ?, "
+                "new_total = new_total + ?, gone_total = gone_total + ? "
+                "WHERE location = ?",
+                (scraped_at, scraped_at, scrape_id, scraped_at, summary["properties"], summary["priced"], price_total, summary["rated"], rating_total,
+                 json.dumps(rating_bins, sort_keys=True), new_listings or 0, gone_listings or 0, travel_location),
+            )
+
+    return True
+
+#function that records every scrape in the database that has not been recorded yet, oldest first, and returns how many were recorded
+#used for databases created before the analytics existed, or for scrapes that failed part way through
+def backfill(filename=STORE_FILENAME):
+    connection = open_analytics(filename)
+    try:
+        scrape_ids = [row[0] for row in connection.execute(
+            "SELECT id FROM scrapes WHERE id NOT IN (SELECT scrape_id FROM scrape_summaries) ORDER BY scraped_at, id"
+        )]
+        recorded = 0
+        for scrape_id in scrape_ids:
+            if record_scrape(connection, scrape_id):
+                recorded += 1
+    finally:
+        connection.close()
+
+    return recorded
+
+#function that returns the statistics of every recorded scrape of a location in the order they were scraped, as a dataframe
+def get_location_trend(travel_location, filename=STORE_FILENAME):
+    import pandas as pd
+    connection = open_analytics(filename)
+    try:
+        return pd.read_sql_query(
+            "SELECT scrape_id, scraped_at, properties, mean_price, median_price, min_price, max_price, mean_rating, rating_bins, new_listings, gone_listings "
+            "FROM scrape_summaries WHERE location = ? ORDER BY scraped_at, scrape_id",
+            connection,
+            params=(" ".join(travel_location.split()),),
+        )
+    finally:
+        connection.close()
+
+#function that returns one row for each location (or each of the given locations) comparing the latest scrape with the running totals of every scrape
+def compare_locations(travel_locations=None, filename=STORE_FILENAME):
+    import pandas as pd
+    query = (
+        "SELECT location_summaries.location, location_summaries.scrapes, location_summaries.first_scraped_at, location_summaries.last_scraped_at, "
+        "latest.properties AS latest_properties, latest.mean_price AS latest_mean_price, latest.median_price AS latest_median_price, latest.mean_rating AS latest_mean_rating, "
+        "location_summaries.price_total / NULLIF(location_summaries.priced_total, 0) AS mean_price, "
+        "location_summaries.rating_total / NULLIF(location_summaries.rated_total, 0) AS mean_rating, "
+        "location_summaries.new_total, location_summaries.gone_total, location_summaries.rating_bins "
+        "FROM location_summaries JOIN scrape_summaries AS latest ON latest.scrape_id = location_summaries.last_scrape_id"
+    )
+    params = ()
+    if travel_locations is not None:
+        query += f" WHERE location_summaries.location IN ({', '.join('?' * len(travel_locations))})"
+        params = tuple(" ".join(travel_location.split()) for travel_location in travel_locations)
+    query += " ORDER BY location_summaries.location"
+
+    connection = open_analytics(filename)
+    try:
+        return pd.read_sql_query(query, connection, params=params)
+    finally:
+        connection.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Show how the prices, ratings and listings of each location have changed over time")
+    parser.add_argument("locations", nargs="*", help="the locations to show the trend of (every location is compared if none are given)")
+    parser.add_argument("--database", default=STORE_FILENAME, help="the property database")
+    parser.add_argument("--backfill", action="store_true", help="record any scrapes in the database that have not been recorded yet first")
+    arguments = parser.parse_args()
+
+    if arguments.backfill:
+        print(f"Recorded {backfill(arguments.database)} scrapes")
+
+    if arguments.locations == []:
+        print(compare_locations(filename=arguments.database).drop(columns="rating_bins").to_string(index=False))
+        return
+
+    for travel_location in arguments.locations:
+        print(travel_location)
+        print(get_location_trend(travel_location, arguments.database).drop(columns="rating_bins").to_string(index=False))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,369 @@
+#benchmark of the scraping and saving paths of TravelPropertyAnalysis, run end to end against a local copy of an Airbnb-like results site
+#the fixture pages are built from the same XPaths the scraper reads, so they have the same DOM shape as the pages the scraper targets
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs, unquote
+
+import TravelPropertyAnalysis as tpa
+
+#the file the results of a benchmark are saved to and compared against
+BASELINE_FILENAME = "benchmark_baseline.json"
+#how much worse than the baseline (as a fraction) a result can be before it counts as a regression
+REGRESSION_TOLERANCE = 0.2
+#the results where a higher value is better - for every other compared result a lower value is better
+HIGHER_IS_BETTER = ("pages_per_second", "listings_per_second")
+#the results compared with the baseline
+COMPARED_RESULTS = ("pages_per_second", "listings_per_second", "p50_page_seconds", "p95_page_seconds", "peak_rss_mb")
+#the benchmark settings that must match the baseline for the results to be comparable
+SETTINGS = ("engine", "locations", "pages", "cards", "latency", "lean")
+#elements that have no closing tag in HTML
+VOID_TAGS = ("img", "link")
+#the size in bytes of each listing photo and of the font served by the fixture site
+IMAGE_BYTES = 40 * 1024
+FONT_BYTES = 30 * 1024
+#the stylesheet of the fixture site, which makes the browser download a font as the real website does
+STYLESHEET = """@font-face { font-family: "Fixture Sans"; src: url("/assets/fixture-sans.woff2") format("woff2"); }
+body { font-family: "Fixture Sans", sans-serif; }"""
+
+#function that adds an XPath to a tree of elements, creating the elements along it, and sets the text and attributes of the last one
+def add_path(tree, path, text="", attributes=None):
+    node = tree
+    for step in path.strip("/").split("/"):
+        tag, index = re.fullmatch(r"(\w+)(?:\[(\d+)\])?", step).groups()
+        node = node["children"].setdefault((tag, int(index or 1)), {"children": {}, "text": "", "attributes": {}})
+    node["text"] = text
+    if attributes is not None:
+        node["attributes"].update(attributes)
+
+#function that turns a tree of elements into HTML - empty elements are added before each element so it is at the position its XPath gives
+def render_tree(node):
+    html = node["text"]
+    last_index = {}
+    for tag, index in node["children"]:
+        last_index[tag] = max(last_index.get(tag, 0), index)
+
+    for tag, count in last_index.items():
+        for index in range(1, count + 1):
+            child = node["children"].get((tag, index))
+            if child is None:
+                html += f"<{tag}></{tag}>"
+            else:
+                attributes = "".join(f' {name}="{value}"' for name, value in child["attributes"].items())
+                if tag in VOID_TAGS:
+                    html += f"<{tag}{attributes}>"
+                else:
+                    html += f"<{tag}{attributes}>{render_tree(child)}</{tag}>"
+    return html
+
+#function that builds a page of search results for a location with the same structure as the Airbnb results page
+#like the real page it loads a stylesheet and font, a photo for each listing, a video and a tracking script, so a browser visiting it downloads more than the text the scraper reads
+def create_results_page(travel_location, page, pages, cards):
+    tree = {"children": {}, "text": "", "attributes": {}}
+    add_path(tree, "/html/head/link", "", {"rel": "stylesheet", "href": "/assets/site.css"})
+    #the fixture site only has one host, so the tag manager's host name is part of the path for the lean profile to match
+    add_path(tree, "/html/head/script", "", {"src": "/assets/www.googletagmanager.com/gtm.js"})
+    add_path(tree, "/html/body/video", "", {"src": "/assets/promo.mp4", "preload": "auto", "muted": "muted"})
+    for card_index in range(1, cards + 1):
+        listing_number = (page - 1) * cards + card_index
+        card_path = f"{tpa.RESULTS_PATH}/div[{card_index}]"
+        #the link to the listing's own page, which the listing id is read from
+        add_path(tree, f"{card_path}/div/a", "", {"href": f"/rooms/{listing_number}?source_impression_id=benchmark"})
+        add_path(tree, f"{card_path}/div/a/img", "", {"src": f"/assets/listing-{listing_number}.jpg", "alt": ""})
+        add_path(tree, f"{card_path}/{tpa.NAME_SUBPATH}", f"{travel_location} benchmark listing {listing_number}")
+        #every seventh listing is new and has no rating, as on the real website
+        if listing_number % 7 != 0:
+            add_path(tree, f"{card_path}/{tpa.RATING_SUBPATH}", f"{4 + (listing_number % 100) / 100:.2f} ({listing_number * 3})")
+        add_path(tree, f"{card_path}/{tpa.PRICE_SUBPATH}", f"£{50 + listing_number * 7 % 400:,} night")
+
+    #every page but the last links to the next one with the next page button
+    if page < pages:
+        add_path(tree, tpa.NEXT_PAGE_PATH, "Next", {"href": f"?page={page + 1}"})
+
+    return "<!DOCTYPE html>" + render_tree(tree)
+
+#the home page of the fixture site - the search button goes to the results page for the location typed in, as on the real website
+HOME_PAGE = """<!DOCTYPE html>
+<html><body>
+<input id="bigsearch-query-location-input">
+<button data-testid="structured-search-input-search-button" onclick="window.location.href = '/s/' + encodeURIComponent(document.getElementById('bigsearch-query-location-input').value) + '/homes'">Search</button>
+</body></html>"""
+
+#a local HTTP server that serves the fixture site, waiting for latency seconds before each response and counting the requests and bytes it serves
+class FixtureSite:
+    def __init__(self, pages=5, cards=tpa.RESULTS_PER_PAGE, latency=0.0):
+        self.pages = pages
+        self.cards = cards
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.requests_served = 0
+        self.bytes_served = 0
+        #pages are only built once and then served again from memory
+        self.page_cache = {}
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self.create_handler())
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+        self.thread = None
+
+    #function that creates the request handler class of the server, which passes each request to the site
+    def create_handler(self):
+        site = self
+
+        class FixtureHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                status, content_type, body = site.get_page(self.path)
+                if site.latency > 0:
+                    time.sleep(site.latency)
+                encoded_body = body.encode("utf-8") if isinstance(body, str) else body
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(encoded_body)))
+                self.end_headers()
+                self.wfile.write(encoded_body)
+                site.count_request(len(encoded_body))
+
+            #stops the server printing a line for every request
+            def log_message(self, format, *args):
+                pass
+
+        return FixtureHandler
+
+    #function that returns the status code, content type and content of the page or file at a path
+    def get_page(self, path):
+        parsed_path = urlparse(path)
+        if parsed_path.path in ("", "/"):
+            return 200, "text/html; charset=utf-8", HOME_PAGE
+        if parsed_path.path.startswith("/assets/"):
+            return self.get_asset(parsed_path.path)
+
+        path_match = re.fullmatch(r"/s/([^/]+)/homes", parsed_path.path)
+        if path_match is None:
+            return 404, "text/html; charset=utf-8", "<html><body>Not found</body></html>"
+
+        travel_location = unquote(path_match.group(1))
+        page = int(parse_qs(parsed_path.query).get("page", ["1"])[0])
+        if page < 1 or page > self.pages:
+            return 404, "text/html; charset=utf-8", "<html><body>Not found</body></html>"
+
+        with self.lock:
+            if (travel_location, page) not in self.page_cache:
+                self.page_cache[(travel_location, page)] = create_results_page(travel_location, page, self.pages, self.cards)
+            return 200, "text/html; charset=utf-8", self.page_cache[(travel_location, page)]
+
+    #function that returns the status code, content type and content of a file the results pages load - only the size of each file matters
+    def get_asset(self, path):
+        if path == "/assets/site.css":
+            return 200, "text/css", STYLESHEET
+        if path.endswith(".woff2"):
+            return 200, "font/woff2", bytes(FONT_BYTES)
+        if path.endswith(".jpg"):
+            return 200, "image/jpeg", bytes(IMAGE_BYTES)
+        if path.endswith(".mp4"):
+            return 200, "video/mp4", bytes(IMAGE_BYTES)
+        if path.endswith(".js"):
+            return 200, "text/javascript", "window.dataLayer = [];"
+        return 404, "text/plain", "Not found"
+
+    #subroutine that adds a request to the counts of requests and bytes served
+    def count_request(self, size):
+        with self.lock:
+            self.requests_served += 1
+            self.bytes_served += size
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+#function that returns the peak memory use (resident set size) of the process in megabytes, or None if it cannot be measured on this system
+def get_peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    #macOS reports the peak in bytes, Linux in kilobytes
+    if sys.platform == "darwin":
+        return peak_rss / (1024 * 1024)
+    return peak_rss / 1024
+
+#function that returns the value below which the given fraction of the values fall
+def percentile(values, fraction):
+    if values == []:
+        return 0.0
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+#function that scrapes every page of each location from the fixture site and saves them to a database, timing each page
+#the cache is skipped so every page is scraped, and the time of each page includes saving the page before it
+#lean runs the browser with the lean profile - it has no effect on the http engine, which never downloads anything but the results pages
+def run_benchmark(engine="http", locations=3, pages=5, cards=tpa.RESULTS_PER_PAGE, latency=0.0, lean=tpa.LEAN_BROWSER):
+    site = FixtureSite(pages, cards, latency)
+    site.start()
+    pool = tpa.DriverPool(1, lean=lean) if engine == "selenium" else None
+    original_directory = os.getcwd()
+
+    page_seconds = []
+    total_pages = 0
+    total_listings = 0
+    try:
+        with tempfile.TemporaryDirectory() as work_directory:
+            #runs in a temporary folder so the cache and database of the benchmark do not mix with real data
+            os.chdir(work_directory)
+            store_filename = os.path.join(work_directory, "benchmark.db")
+
+            #a location is scraped before timing starts so importing libraries and opening sessions are not counted as scraping time
+            tpa.crawl_location("Warm Up Town", engine, site.url, pool, max_pages=1, filename=os.path.join(work_directory, "warm_up.db"), force_refresh=True)
+            requests_before = site.requests_served
+            bytes_before = site.bytes_served
+
+            start_time = time.perf_counter()
+            for location_number in range(1, locations + 1):
+                last_page_time = time.perf_counter()
+
+                #progress is called as each page is scraped, so the time between calls is the time taken by each page
+                def progress(page, cards_parsed):
+                    nonlocal last_page_time
+                    page_time = time.perf_counter()
+                    page_seconds.append(page_time - last_page_time)
+                    last_page_time = page_time
+
+                scrape_id, stats = tpa.crawl_location(f"Benchmark Town {location_number}", engine, site.url, pool, max_pages=None, filename=store_filename, progress=progress, force_refresh=True)
+                total_pages += stats["pages"]
+                total_listings += stats["properties"]
+            elapsed_seconds = time.perf_counter() - start_time
+    finally:
+        os.chdir(original_directory)
+        if pool is not None:
+            pool.shutdown()
+        site.stop()
+
+    return {
+        "engine": engine,
+        "locations": locations,
+        "pages": pages,
+        "cards": cards,
+        "latency": latency,
+        "lean": lean,
+        "total_pages": total_pages,
+        "total_listings": total_listings,
+        "elapsed_seconds": elapsed_seconds,
+        "pages_per_second": total_pages / elapsed_seconds,
+        "listings_per_second": total_listings / elapsed_seconds,
+        "p50_page_seconds": percentile(page_seconds, 0.5),
+        "p95_page_seconds": percentile(page_seconds, 0.95),
+        "peak_rss_mb": get_peak_rss_mb(),
+        "requests_served": site.requests_served - requests_before,
+        "bytes_served": site.bytes_served - bytes_before,
+        "browser_network": dict(pool.stats) if pool is not None else None,
+    }
+
+#function that compares benchmark results with a baseline and returns a description of each result that is worse by more than the tolerance
+def compare_with_baseline(results, baseline, tolerance=REGRESSION_TOLERANCE):
+    regressions = []
+    for result in COMPARED_RESULTS:
+        current_value = results.get(result)
+        baseline_value = baseline.get(result)
+        if current_value is None or not baseline_value:
+            continue
+
+        if result in HIGHER_IS_BETTER:
+            change = (baseline_value - current_value) / baseline_value
+        else:
+            change = (current_value - baseline_value) / baseline_value
+        if change > tolerance:
+            regressions.append(f"{result}: {current_value:.4g} against a baseline of {baseline_value:.4g} ({change:.0%} worse)")
+
+    return regressions
+
+#subroutine that prints the results of a benchmark
+def print_results(results):
+    print(f"Scraped {results['total_pages']} pages ({results['total_listings']} listings) of {results['locations']} locations with the {results['engine']} engine in {results['elapsed_seconds']:.2f}s")
+    print(f"  pages/sec:    {results['pages_per_second']:.2f}")
+    print(f"  listings/sec: {results['listings_per_second']:.2f}")
+    print(f"  page latency: p50 {results['p50_page_seconds'] * 1000:.1f}ms, p95 {results['p95_page_seconds'] * 1000:.1f}ms")
+    if results["peak_rss_mb"] is not None:
+        print(f"  peak RSS:     {results['peak_rss_mb']:.1f}MB")
+    print(f"  served:       {results['requests_served']} requests, {results['bytes_served']} bytes")
+    browser_network = results.get("browser_network")
+    if browser_network is not None and "requests_blocked" in browser_network:
+        print(f"  browser:      {browser_network['requests_loaded']} requests loaded, {browser_network['requests_blocked']} blocked by the lean profile")
+
+#function that runs the benchmark with the full browser and then with the lean profile and prints the requests and bytes the lean profile avoided
+#the counts come from the fixture site itself, so they include requests the browser does not report
+def compare_lean_profile(locations, pages, cards, latency):
+    full_results = run_benchmark("selenium", locations, pages, cards, latency, lean=False)
+    lean_results = run_benchmark("selenium", locations, pages, cards, latency, lean=True)
+    print_results(full_results)
+    print_results(lean_results)
+
+    avoided_requests = full_results["requests_served"] - lean_results["requests_served"]
+    avoided_bytes = full_results["bytes_served"] - lean_results["bytes_served"]
+    print(f"The lean profile avoided {avoided_requests} of {full_results['requests_served']} requests ({avoided_requests / max(full_results['requests_served'], 1):.0%}) "
+          f"and {avoided_bytes} of {full_results['bytes_served']} bytes ({avoided_bytes / max(full_results['bytes_served'], 1):.0%})")
+    print(f"Scraping took {lean_results['elapsed_seconds']:.2f}s with the lean profile against {full_results['elapsed_seconds']:.2f}s without")
+    return {"full": full_results, "lean": lean_results, "avoided_requests": avoided_requests, "avoided_bytes": avoided_bytes}
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the property scraper against a local fixture site")
+    parser.add_argument("--engine", choices=("http", "selenium"), default="http", help="the scraping engine to benchmark")
+    parser.add_argument("--locations", type=int, default=3, help="the number of locations to scrape")
+    parser.add_argument("--pages", type=int, default=5, help="the number of pages of results for each location")
+    parser.add_argument("--cards", type=int, default=tpa.RESULTS_PER_PAGE, help="the number of listings on each page")
+    parser.add_argument("--latency", type=float, default=0.0, help="the number of seconds the site waits before each response")
+    parser.add_argument("--full-browser", action="store_true", help="run the selenium engine without the lean profile")
+    parser.add_argument("--compare-lean", action="store_true", help="run the selenium engine with and without the lean profile and report what the lean profile avoided")
+    parser.add_argument("--baseline", default=BASELINE_FILENAME, help="the file of baseline results to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="save the results as the new baseline instead of comparing")
+    parser.add_argument("--tolerance", type=float, default=REGRESSION_TOLERANCE, help="how much worse than the baseline a result can be, as a fraction")
+    arguments = parser.parse_args()
+
+    if arguments.compare_lean:
+        compare_lean_profile(arguments.locations, arguments.pages, arguments.cards, arguments.latency)
+        return 0
+
+    results = run_benchmark(arguments.engine, arguments.locations, arguments.pages, arguments.cards, arguments.latency, lean=not arguments.full_browser)
+    print_results(results)
+
+    if arguments.save_baseline:
+        with open(arguments.baseline, "w", encoding="utf-8") as baseline_file:
+            json.dump(results, baseline_file, indent=2)
+        print(f"Saved the results as the baseline in {arguments.baseline}")
+        return 0
+
+    if not os.path.exists(arguments.baseline):
+        print(f"No baseline found at {arguments.baseline} - run with --save-baseline to create one")
+        return 0
+
+    with open(arguments.baseline, encoding="utf-8") as baseline_file:
+        baseline = json.load(baseline_file)
+
+    #results are only comparable if the benchmark was run with the same settings as the baseline
+    different_settings = [setting for setting in SETTINGS if baseline.get(setting) != results[setting]]
+    if different_settings != []:
+        print(f"The baseline was run with different settings ({', '.join(different_settings)}) so it has not been compared")
+        return 0
+
+    regressions = compare_with_baseline(results, baseline, arguments.tolerance)
+    if regressions == []:
+        print(f"No regressions against the baseline (tolerance {arguments.tolerance:.0%})")
+        return 0
+
+    print("Regressions against the baseline:")
+    for regression in regressions:
+        print(f"  {regression}")
+    return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,60 +1,1185 @@
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.edge.options import Options
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions
-from selenium.common.exceptions import TimeoutException, StaleElementReferenceException
-import pandas as pd
-import numpy as np
-import matplotlib.pyplot as plt
+#selenium, pandas, numpy, matplotlib, requests, lxml and tkinter are slow to import, so each is imported inside the functions that use it
+#this keeps start up quick and lets a headless run go without a display or the libraries of the stages it does not run
 import os
-import tkinter as tk
+import re
+import json
+import hashlib
+import base64
+import sqlite3
+from datetime import datetime, timezone
+import time
+import random
+import io
+import functools
+import cProfile
+import pstats
+import atexit
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future, as_completed
+from contextlib import contextmanager
+from urllib.parse import quote, urljoin
+import argparse
+import sys
+
+#the address of the Airbnb website that searches are run against
+BASE_URL = "https://www.airbnb.co.uk"
+#the engine used to collect property data - "selenium" drives an Edge browser, "http" downloads and parses the results page directly
+SCRAPE_ENGINE = "selenium"
+#headers sent with every HTTP request so the server returns the same results page a browser would receive
+HTTP_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36 Edg/124.0.0.0",
+    "Accept-Language": "en-GB,en;q=0.9",
+}
+#the number of seconds to wait for the server to respond to an HTTP request
+HTTP_TIMEOUT = 10
+#the maximum number of headless browser sessions kept open at once for searches
+DRIVER_POOL_SIZE = 1
+#the size of the browser window - fixed so the results page always has the desktop layout the XPaths are written for, and smaller than a maximised window
+WINDOW_SIZE = (1280, 900)
+#runs the browser with the lean profile, which stops it downloading what the scraper never reads - images, media, fonts and tracking scripts
+LEAN_BROWSER = True
+#the URL patterns the lean profile blocks for each kind of resource ("*" matches any text)
+LEAN_BLOCKED_RESOURCES = {
+    "images": ["*.jpg*", "*.jpeg*", "*.png*", "*.gif*", "*.webp*", "*.avif*", "*.svg*", "*.ico*", "*/im/pictures/*"],
+    "media": ["*.mp4*", "*.webm*", "*.mp3*", "*.m3u8*"],
+    "fonts": ["*.woff*", "*.ttf*", "*.otf*"],
+    "third_party": ["*googletagmanager.com*", "*google-analytics.com*", "*doubleclick.net*", "*facebook.net*", "*connect.facebook.com*", "*hotjar.com*", "*branch.io*", "*sentry.io*", "*bat.bing.com*", "*analytics.tiktok.com*"],
+}
+#the kinds of resource (keys of LEAN_BLOCKED_RESOURCES) or single URL patterns the lean profile still lets through, e.g. ("fonts", "*.svg*")
+LEAN_ALLOW_LIST = ()
+#the number of locations scraped at the same time by a batch search
+BATCH_WORKERS = 4
+#a common filename used to store data for each location entered by the user, where each location is stored on separate sheets
+DATA_FILENAME = "property_data.xlsx"
+#the SQLite database that every scrape is appended to as a timestamped batch
+STORE_FILENAME = "property_data.db"
+#the format scraped data is saved in - "sqlite" appends to the database, "xlsx" replaces the location's sheet in the excel file
+STORAGE_FORMAT = "sqlite"
+
+#error raised when a search for a location does not return any properties
+class NoResultsError(Exception):
+    pass
+
+#error raised inside a search when the user has cancelled it
+class SearchCancelled(Exception):
+    pass
+
+#error raised when the results of a search could not be loaded after every retry, e.g. because the website is blocking the scraper
+class ScrapeFailedError(Exception):
+    pass
+
+#error raised when searches for a location have been stopped for a while because too many of them have failed in a row
+class CircuitOpenError(Exception):
+    pass
+
+#the full XPath of the element that holds every property card on a results page - each card is one of its div children
+RESULTS_PATH = "/html/body/div[5]/div/div/div[1]/div/div/div[2]/div[1]/main/div[2]/div/div[2]/div/div/div/div/div"
+#the XPaths of each piece of data relative to a single property card
+NAME_SUBPATH = "div/div[2]/div/div/div/div/div/div[2]/div[3]/span"
+RATING_SUBPATH = "div/div[2]/div/div/div/div/div/div[2]/div[7]/span/span[3]"
+PRICE_SUBPATH = "div/div[2]/div/div/div/div/div/div[2]/div[6]/div[2]/div/div/span[1]"
+#the XPath of the link to a property's own page relative to its card - the stable id of the listing is taken from the link
+LISTING_LINK_SUBPATH = ".//a[contains(@href, '/rooms/')]"
+#the number of property cards shown on each page of results
+RESULTS_PER_PAGE = 17
+#the full XPath of the next page button
+NEXT_PAGE_PATH = "/html/body/div[5]/div/div/div[1]/div/div/div[2]/div[1]/main/div[2]/div/div[3]/div/div/div/nav/div/a[5]"
+#the number of pages of results collected for each search - None keeps going until there are no more pages
+MAX_PAGES = 1
+#the folder that parsed pages of results are cached in so repeated searches do not have to scrape the website again
+CACHE_DIRECTORY = ".property_cache"
+#the number of seconds a cached page of results is used for before it is scraped again
+CACHE_TTL = 60 * 60
+#the total size in bytes the cache can grow to before the oldest pages are removed
+CACHE_MAX_BYTES = 50 * 1024 * 1024
+#the version of the page data stored in the cache - it is part of the cache key so pages cached in an older form are not used
+CACHE_VERSION = 2
+#the number of times a search or page request is tried before giving up
+RETRY_ATTEMPTS = 3
+#the delay in seconds before the first retry - each retry after that waits up to twice as long as the one before, up to RETRY_MAX_DELAY
+RETRY_BASE_DELAY = 2
+RETRY_MAX_DELAY = 30
+#HTTP status codes that mean the server is busy or blocking requests, so the request is tried again later
+RETRY_STATUS_CODES = (403, 429, 500, 502, 503, 504)
+#the number of searches for a location in a row that can fail before searches for it are stopped, and the number of seconds they are stopped for
+CIRCUIT_FAILURE_LIMIT = 3
+CIRCUIT_COOLDOWN = 15 * 60
+#the number of seconds to wait for a results page to show either properties or a no results message
+RESULTS_TIMEOUT = 10
+#the number of seconds to wait for each element once the results are known to have loaded
+READY_ELEMENT_TIMEOUT = 0.5
+#the XPath of the message shown when a search has no results
+NO_RESULTS_PATH = "//*[contains(text(), 'No exact matches')]"
+#the folder that the timing report of each run is written to
+REPORT_DIRECTORY = "run_reports"
+#runs the Python profiler (cProfile) during each run and saves its statistics next to the report
+PROFILE_RUNS = False
+#the format the graphs are saved in when they are written to files - "png" or "svg"
+CHART_FORMAT = "png"
+#above this number of properties the graphs show the distribution of the ratings and prices instead of one bar per property, which stops being readable
+AGGREGATE_THRESHOLD = 50
+#the number of properties shown in the pie chart and in the most reviewed properties chart
+TOP_LISTINGS = 10
+
+#script run inside the browser that reads the name, rating and price text and the link of every property card in one go instead of one WebDriver call per element
+#null is returned for an element that does not exist so the Python side can tell a missing element apart from an empty one
+CARD_SCRIPT = """
+var container = document.evaluate(arguments[0], document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+if (!container) { return null; }
+function cardText(card, path) {
+    var node = document.evaluate(path, card, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    return node ? node.innerText.trim() : null;
+}
+function cardLink(card, path) {
+    var node = document.evaluate(path, card, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    return node ? node.getAttribute("href") : null;
+}
+var cards = document.evaluate("div", container, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+var results = [];
+for (var i = 0; i < cards.snapshotLength && i < arguments[4]; i++) {
+    var card = cards.snapshotItem(i);
+    results.push([cardText(card, arguments[1]), cardText(card, arguments[2]), cardText(card, arguments[3]), cardLink(card, arguments[5])]);
+}
+return results;
+"""
+
+#records how long each stage of a run takes and how much time is spent waiting for elements, so a report can be written at the end of the run
+class RunProfile:
+    def __init__(self, label, cprofile=False):
+        self.label = label
+        self.started_at = datetime.now(timezone.utc)
+        self.start_time = time.perf_counter()
+        self.lock = threading.Lock()
+        #the number of calls, total time and longest time of each stage
+        self.stages = {}
+        #the number of element waits, how many of them timed out and the time spent on each
+        self.waits = {"waits": 0, "timeouts": 0, "wait_seconds": 0.0, "timeout_seconds": 0.0}
+        #the cache counters when the run started, so only the cache lookups made during the run are reported
+        self.cache_start = get_cache_stats()
+        #the driver pool whose counters are reported and its counters when it was attached - the shared pool, unless another is attached
+        self.pool = None
+        self.pool_start = {}
+        if driver_pool is not None:
+            self.attach_pool(driver_pool)
+        #the optional cProfile profiler of the thread that started the run, and the profilers of the worker threads run with profile_thread
+        self.cprofile = cprofile
+        self.profiler = None
+        self.thread_profilers = []
+        self.profile_stats = None
+        self.profile_text = ""
+        if cprofile:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    #subroutine that makes the run report the counters of a driver pool from now on, such as the pool of a batch
+    def attach_pool(self, pool):
+        self.pool = pool
+        self.pool_start = dict(pool.stats)
+
+    #function that calls function on a worker thread of the run and returns its result, profiling it with cProfile if the run is profiled
+    #cProfile only profiles the thread it is started on, so each worker thread needs its own profiler
+    def profile_thread(self, function, *args, **kwargs):
+        if not self.cprofile:
+            return function(*args, **kwargs)
+
+        thread_profiler = cProfile.Profile()
+        try:
+            thread_profiler.enable()
+        except ValueError:
+            #newer versions of Python profile every thread with one profiler and do not allow a second one to start
+            return function(*args, **kwargs)
+        try:
+            return function(*args, **kwargs)
+        finally:
+            thread_profiler.disable()
+            with self.lock:
+                self.thread_profilers.append(thread_profiler)
+
+    #subroutine that adds the time taken by one call of a stage
+    def record_stage(self, stage, seconds):
+        with self.lock:
+            totals = self.stages.setdefault(stage, {"calls": 0, "seconds": 0.0, "max_seconds": 0.0})
+            totals["calls"] += 1
+            totals["seconds"] += seconds
+            totals["max_seconds"] = max(totals["max_seconds"], seconds)
+
+    #subroutine that adds the time taken by one wait for an element and whether it timed out without finding it
+    def record_wait(self, seconds, timed_out):
+        with self.lock:
+            self.waits["waits"] += 1
+            self.waits["wait_seconds"] += seconds
+            if timed_out:
+                self.waits["timeouts"] += 1
+                self.waits["timeout_seconds"] += seconds
+
+    #subroutine that stops the cProfile profiler, if it is running, and merges it with the profilers of the worker threads, keeping a summary of the slowest functions
+    def stop_profiler(self):
+        if self.profiler is None or self.profile_stats is not None:
+            return
+        self.profiler.disable()
+        profile_output = io.StringIO()
+        self.profile_stats = pstats.Stats(self.profiler, stream=profile_output)
+        with self.lock:
+            for thread_profiler in self.thread_profilers:
+                self.profile_stats.add(thread_profiler)
+        self.profile_stats.sort_stats("cumulative").print_stats(15)
+        self.profile_text = profile_output.getvalue()
+
+    #function that returns the results of the run as a dictionary that can be saved as JSON
+    def report(self):
+        with self.lock:
+            stages = {stage: dict(totals) for stage, totals in self.stages.items()}
+            waits = dict(self.waits)
+        report = {
+            "label": self.label,
+            "started_at": self.started_at.isoformat(timespec="seconds"),
+            "total_seconds": time.perf_counter() - self.start_time,
+            "stages": stages,
+            "element_waits": waits,
+            "cache": {counter: count - self.cache_start.get(counter, 0) for counter, count in get_cache_stats().items()},
+        }
+        #a pool created during the run, such as the shared pool when the first search starts it, is reported from zero
+        pool = self.pool if self.pool is not None else driver_pool
+        if pool is not None:
+            pool_start = self.pool_start if pool is self.pool else {}
+            report["driver_pool"] = {counter: count - pool_start.get(counter, 0) for counter, count in dict(pool.stats).items()}
+        return report
+
+    #function that returns the results of the run as text for the user to read
+    def summary(self, report=None):
+        if report is None:
+            report = self.report()
+        lines = [f"Run report for {self.label} - {report['total_seconds']:.2f}s in total"]
+        #lists the slowest stages first - stages can be inside other stages, so their times can add up to more than the total
+        for stage, totals in sorted(report["stages"].items(), key=lambda item: item[1]["seconds"], reverse=True):
+            lines.append(f"  {stage:<24}{totals['seconds']:>9.2f}s  {totals['calls']:>5} call(s)  longest {totals['max_seconds']:.2f}s")
+        waits = report["element_waits"]
+        lines.append(f"  element waits: {waits['waits']} ({waits['wait_seconds']:.2f}s), of which {waits['timeouts']} timed out wasting {waits['timeout_seconds']:.2f}s")
+        pool_stats = report.get("driver_pool", {})
+        if "requests_blocked" in pool_stats:
+            lines.append(f"  browser network: {pool_stats['requests_loaded']} requests loaded ({pool_stats['bytes_loaded'] / 1024:.0f}KB), {pool_stats['requests_blocked']} blocked by the lean profile")
+        if self.profile_text != "":
+            lines.append(self.profile_text)
+        return "\n".join(lines)
+
+#the run that stages are currently being recorded against, or None if no run is being recorded
+current_run = None
+
+#function that starts recording a new run and returns it
+def start_run(label, cprofile=PROFILE_RUNS):
+    global current_run
+    current_run = RunProfile(label, cprofile)
+    return current_run
+
+#function that ends a run, writing its report as JSON (and the cProfile statistics, if recorded) and printing a summary - returns the path of the report
+def finish_run(run, directory=REPORT_DIRECTORY):
+    global current_run
+    run.stop_profiler()
+    if current_run is run:
+        current_run = None
+
+    report = run.report()
+    os.makedirs(directory, exist_ok=True)
+    report_name = f"run_{run.started_at:%Y%m%d_%H%M%S}_{re.sub(r'[^A-Za-z0-9]+', '_', run.label)}"
+    if run.profile_stats is not None:
+        profile_path = os.path.join(directory, report_name + ".prof")
+        run.profile_stats.dump_stats(profile_path)
+        report["profile"] = profile_path
+
+    report_path = os.path.join(directory, report_name + ".json")
+    with open(report_path, "w", encoding="utf-8") as report_file:
+        json.dump(report, report_file, indent=2)
+
+    print(run.summary(report))
+    print(f"Run report saved to {report_path}")
+    return report_path
+
+#records the time taken by the code inside a with block as a stage of the run (the current run if none is given)
+@contextmanager
+def timed_stage(stage, run=None):
+    if run is None:
+        run = current_run
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        if run is not None:
+            run.record_stage(stage, time.perf_counter() - start_time)
+
+#decorator that records the time taken by each call of a function as a stage of the current run
+def profiled(stage):
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with timed_stage(stage):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+#subroutine that records a wait for an element against the current run
+def record_element_wait(seconds, timed_out):
+    if current_run is not None:
+        current_run.record_wait(seconds, timed_out)
+
+#function that returns an argument type for a whole number that is at least minimum, so argparse rejects anything smaller with a usage error
+def count_argument(minimum):
+    def parse_count(value):
+        try:
+            count = int(value)
+        except ValueError:
+            raise argparse.ArgumentTypeError(f"invalid whole number: {value!r}")
+        if count < minimum:
+            raise argparse.ArgumentTypeError(f"must be at least {minimum}, not {count}")
+        return count
+    return parse_count
+
+#function that reads the command line arguments - locations are searched for without the GUI, which is only opened when no locations are given
+def parse_arguments(arguments=None):
+    parser = argparse.ArgumentParser(description="Scrape, save and analyse Airbnb properties for each location given, or open the GUI if none are given")
+    parser.add_argument("locations", nargs="*", help="the locations to search for")
+    parser.add_argument("--pages", type=count_argument(0), default=MAX_PAGES, help="the number of pages of results to scrape for each location (0 for every page)")
+    parser.add_argument("--format", choices=("sqlite", "xlsx"), default=STORAGE_FORMAT, help="the format the property data is saved in")
+    parser.add_argument("--output", default=None, help="the file the property data is saved to (defaults to the database or excel file for the format)")
+    parser.add_argument("--engine", choices=("selenium", "http"), default=SCRAPE_ENGINE, help="the engine used to collect the property data")
+    parser.add_argument("--workers", type=count_argument(1), default=BATCH_WORKERS, help="the number of locations scraped at the same time")
+    parser.add_argument("--plots", default=None, metavar="DIRECTORY", help="the folder the graphs of each location are saved to as images (graphs are skipped if not given)")
+    parser.add_argument("--plot-format", choices=("png", "svg"), default=CHART_FORMAT, help="the image format the graphs are saved in")
+    parser.add_argument("--refresh", action="store_true", help="ignore cached pages and scrape the website again")
+    parser.add_argument("--clear-cache", action="store_true", help="remove every cached page before any locations are searched for")
+    parser.add_argument("--only-changed", action="store_true", help="only report the listings that are new or have changed since the last scrape - every listing is still stored (sqlite format only)")
+    parser.add_argument("--profile", action="store_true", help="profile the run with cProfile as well as timing its stages")
+    parser.add_argument("--migrate", nargs="?", const=DATA_FILENAME, default=None, metavar="EXCEL_FILE", help=f"import the property data of an excel file (default {DATA_FILENAME}) into the database before any locations are searched for")
+    parser.add_argument("--export", nargs="?", const=DATA_FILENAME, default=None, metavar="EXCEL_FILE", help=f"export the latest property data in the database to an excel file (default {DATA_FILENAME}) after any locations are searched for - only the locations given are exported if there are any")
+    return parser.parse_args(arguments)
+
+#function that runs the program from the command line and returns its exit status
+def main(arguments=None):
+    options = parse_arguments(arguments)
+    #the database migrated into and exported from is the output file if the property data is saved to a database, otherwise the default one
+    store_filename = options.output if options.format == "sqlite" and options.output is not None else STORE_FILENAME
+
+    if options.clear_cache:
+        clear_cache()
+        print(f"Cleared the page cache in {CACHE_DIRECTORY}")
+
+    if options.migrate is not None:
+        imported = migrate_excel(options.migrate, store_filename)
+        print(f"Imported {len(imported)} location(s) from {options.migrate} into {store_filename}")
+
+    if options.locations == [] and (options.clear_cache or options.migrate is not None or options.export is not None):
+        return export_from_store(options.export, store_filename)
+
+    if options.locations == []:
+        #creates the graphical user interface (GUI) for the user to interact with
+        window = create_window()
+
+        window.mainloop()
+        return 0
 
-def main():
-    #creates the graphical user interface (GUI) for the user to interact with
-    window = create_window()
+    #a page limit of 0 scrapes every page of results
+    max_pages = options.pages if options.pages > 0 else None
+    status = run_headless(options.locations, engine=options.engine, max_pages=max_pages, storage=options.format, filename=options.output, plot_directory=options.plots,
+                          max_workers=options.workers, force_refresh=options.refresh, cprofile=options.profile, chart_format=options.plot_format, only_changed=options.only_changed)
+    return max(status, export_from_store(options.export, store_filename, options.locations or None))
+
+#function that exports the database to excel_filename if an export was asked for (excel_filename is not None) and returns the exit status
+def export_from_store(excel_filename, filename=STORE_FILENAME, travel_locations=None):
+    if excel_filename is None:
+        return 0
+    if export_excel(excel_filename, filename, travel_locations) is None:
+        print(f"There is no property data in {filename} to export")
+        return 1
+    print(f"Exported the property data in {filename} to {excel_filename}")
+    return 0
+
+#function that runs every stage of a search for each location without the GUI, so it can be scheduled on a server with no display
+#the locations are scraped and saved as a batch, then the graphs of each one are saved as images in plot_directory, or skipped if it is None
+#returns 1 if any location failed and 0 otherwise
+def run_headless(travel_locations, engine=SCRAPE_ENGINE, max_pages=MAX_PAGES, storage=STORAGE_FORMAT, filename=None, plot_directory=None, max_workers=BATCH_WORKERS, force_refresh=False, cprofile=PROFILE_RUNS, chart_format=CHART_FORMAT, only_changed=False):
+    results = scrape_locations(travel_locations, engine, max_workers, filename, storage=storage, max_pages=max_pages, force_refresh=force_refresh, cprofile=cprofile, only_changed=only_changed)
+
+    if plot_directory is not None:
+        for travel_location, saved_as in results["saved"].items():
+            property_df = load_persisted_data(saved_as, storage, filename)
+            chart_path = save_charts(property_df, travel_location, plot_directory, chart_format=chart_format)
+            print(f"Saved the graphs of {travel_location} to {chart_path}")
+
+    if results["failed"] != {}:
+        return 1
+    return 0
+
+#function that runs the stages of a search - the property data is scraped, turned into a dataframe and then saved on a background thread
+#returns the dataframe straight away so it can be analysed without reading it back from storage, along with the time taken by each stage and a future that completes when the data is saved
+#when saving to the database each page is instead written as soon as it is scraped, and the dataframe is made from the same pages without reading them back
+#progress is called with the current page and the number of properties parsed so far and cancel_event stops the search when it is set
+#force_refresh ignores any cached pages and scrapes the website again
+def run_search(travel_location, engine=SCRAPE_ENGINE, progress=None, cancel_event=None, storage=STORAGE_FORMAT, max_pages=MAX_PAGES, force_refresh=False, base_url=BASE_URL, filename=None):
+    import pandas as pd
+    timings = {}
+
+    if storage == "sqlite":
+        pages = []
+        crawl_timings = {}
+        start_time = time.perf_counter()
+        with timed_stage("scrape"):
+            scrape_id, stats = crawl_location(travel_location, engine, base_url, max_pages=max_pages, filename=filename, progress=progress, cancel_event=cancel_event,
+                                              force_refresh=force_refresh, on_page=pages.append, timings=crawl_timings)
+        #the time spent appending the pages to the database is reported as its own stage rather than as part of the scrape
+        timings["scrape"] = time.perf_counter() - start_time - crawl_timings.get("persist", 0.0)
+        print_running_stats(travel_location, stats)
+
+        start_time = time.perf_counter()
+        property_df = pd.DataFrame(collect_pages(pages))
+        timings["dataframe"] = time.perf_counter() - start_time
+        timings["persist"] = crawl_timings.get("persist", 0.0)
+
+        #the scrape has already been saved, so the future is complete
+        saved = Future()
+        saved.set_result(scrape_id)
+        return property_df, timings, saved
+
+    #calls a function that collects the property data for the location using the chosen engine
+    start_time = time.perf_counter()
+    with timed_stage("scrape"):
+        property_data = scrape_location(travel_location, engine, base_url, progress=progress, cancel_event=cancel_event, max_pages=max_pages, force_refresh=force_refresh)
+    timings["scrape"] = time.perf_counter() - start_time
+    if property_data == "":
+        raise NoResultsError(f"No properties were found for {travel_location}")
 
-    window.mainloop()
+    #creates a dataframe out of the data retrieved that was stored in a dictionary of lists
+    start_time = time.perf_counter()
+    property_df = pd.DataFrame(property_data)
+    timings["dataframe"] = time.perf_counter() - start_time
     
-def initiate(travel_location):
+    #calls a function that saves the data in the chosen storage format on the background thread
+    saved = persist_in_background(property_data, travel_location, storage, timings, filename)
+
+    return property_df, timings, saved
+
+#a single background thread that saves scraped data, so searches do not wait for it to be written and saves happen one at a time
+persist_executor = ThreadPoolExecutor(max_workers=1)
+
+#function that saves property data on the background thread and records how long it took in timings - returns a future of where it was saved
+def persist_in_background(property_data, travel_location, storage=STORAGE_FORMAT, timings=None, filename=None):
+
+    #the save is recorded against the run that was being recorded when it was started, even if it finishes after another run has begun
+    run = current_run
+
+    def persist():
+        start_time = time.perf_counter()
+        with timed_stage("save", run):
+            saved_as = persist_data(property_data, travel_location, storage, filename)
+        if timings is not None:
+            timings["persist"] = time.perf_counter() - start_time
+        return saved_as
+
+    return persist_executor.submit(persist)
+
+#subroutine that prints the time taken by each stage of a search
+def print_stage_timings(travel_location, timings):
+    stages = ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in timings.items())
+    print(f"{travel_location} stage timings: {stages}")
+
+#function that scrapes several locations at the same time, each worker using its own browser session, and saves each location separately
+#a location that fails is recorded and does not stop the others - returns where each location was saved, the errors and the throughput of the batch
+def scrape_locations(travel_locations, engine=SCRAPE_ENGINE, max_workers=BATCH_WORKERS, filename=None, base_url=BASE_URL, storage=STORAGE_FORMAT, max_pages=MAX_PAGES, force_refresh=False, cprofile=PROFILE_RUNS, only_changed=False):
+    start_time = time.perf_counter()
+    run = start_run(f"batch of {len(travel_locations)} locations", cprofile)
+
+    #gives the batch its own driver pool with one browser session per worker
+    pool = None
+    if engine == "selenium":
+        pool = DriverPool(max_workers)
+        #the run reports the counters of the batch's pool, such as the requests the lean profile blocked
+        run.attach_pool(pool)
+
+    saved = {}
+    failed = {}
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {}
+            for travel_location in travel_locations:
+                #each worker is profiled separately as cProfile only profiles the thread it runs on
+                future = executor.submit(run.profile_thread, scrape_and_save, travel_location, engine, filename, base_url, pool, storage=storage, max_pages=max_pages,
+                                         force_refresh=force_refresh, only_changed=only_changed)
+                futures[future] = travel_location
+
+            #records the result of each location as soon as it finishes
+            for future in as_completed(futures):
+                travel_location = futures[future]
+                try:
+                    saved[travel_location] = future.result()
+                except Exception as error:
+                    failed[travel_location] = error
+                    print(f"Failed to scrape {travel_location}: {error}")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        finish_run(run)
+
+    elapsed_seconds = time.perf_counter() - start_time
+    locations_per_minute = len(futures) / (elapsed_seconds / 60) if elapsed_seconds > 0 else 0.0
+    print(f"Scraped {len(saved)} of {len(futures)} locations in {elapsed_seconds:.1f}s ({locations_per_minute:.2f} locations/minute)")
+
+    return {
+        "saved": saved,
+        "failed": failed,
+        "elapsed_seconds": elapsed_seconds,
+        "locations_per_minute": locations_per_minute,
+    }
+
+#function run by each batch worker that scrapes a single location and saves it, returning where it was saved (the scrape id or sheet name)
+#when saving to the database each page is written as soon as it is scraped, otherwise the location is collected in full and then saved
+#only_changed only reports the listings that are new or have changed since they were last stored (database only)
+def scrape_and_save(travel_location, engine, filename, base_url, pool, storage=STORAGE_FORMAT, max_pages=MAX_PAGES, force_refresh=False, only_changed=False):
+    if storage == "sqlite":
+        scrape_id, stats = crawl_location(travel_location, engine, base_url, pool, max_pages, filename, force_refresh=force_refresh, only_changed=only_changed)
+        print_running_stats(travel_location, stats, only_changed)
+        return scrape_id
+
+    property_data = scrape_location(travel_location, engine, base_url, pool, max_pages=max_pages, force_refresh=force_refresh)
+    if property_data == "":
+        raise NoResultsError(f"No properties were found for {travel_location}")
+
+    return persist_data(property_data, travel_location, storage, filename)
+
+#function that scrapes a location page by page, appending each page to the database and updating running statistics as soon as it arrives
+#no more than one page is held in memory at once and the pages already saved are kept if the crawl fails part way through
+#every property is stored - with only_changed the running statistics only cover the listings that are new or have changed since they were last stored
+#pages replayed from the cache are held back until a page is scraped, so a search answered entirely from the cache is not stored again as a new scrape
+#the latest scrape of the location is returned instead if it holds the cached pages - otherwise the cached pages are stored as a new scrape
+#on_page, if given, is called with each page of properties as it arrives and the time spent storing the pages is added to timings["persist"], if given
+#returns the id of the scrape in the database and the running statistics
+def crawl_location(travel_location, engine=SCRAPE_ENGINE, base_url=BASE_URL, pool=None, max_pages=None, filename=None, progress=None, cancel_event=None, force_refresh=False, only_changed=False, on_page=None, timings=None):
+    filename = filename or STORE_FILENAME
+    stats = create_running_stats()
+    scrape_id = None
+    page_sources = []
+    cached_pages = []
+
+    #subroutine that appends pages to the scrape and adds them to the running statistics
+    def store_pages(pages):
+        start_time = time.perf_counter()
+        for page_data in pages:
+            update_running_stats(stats, append_properties(connection, scrape_id, page_data, only_changed))
+        if timings is not None:
+            timings["persist"] = timings.get("persist", 0.0) + time.perf_counter() - start_time
+
+    connection = open_store(filename)
+    try:
+        for page_data in stream_search(travel_location, engine, base_url, pool, max_pages, progress, cancel_event, force_refresh, page_sources):
+            if on_page is not None:
+                on_page(page_data)
+            if page_sources[-1] is not None:
+                cached_pages.append(page_data)
+                continue
+
+            #the scrape is only added to the database once a page of properties has been scraped for it
+            if scrape_id is None:
+                scrape_id = start_scrape(connection, travel_location)
+                store_pages(cached_pages)
+                cached_pages = []
+            store_pages([page_data])
+
+        if scrape_id is None and cached_pages != []:
+            scrape_id = get_cached_scrape_id(connection, travel_location, min(page_sources), sum(len(page_data) for page_data in cached_pages))
+            if scrape_id is not None:
+                #the cached pages have already been stored, so none of their listings are new or changed
+                for page_data in cached_pages:
+                    update_running_stats(stats, [] if only_changed else page_data)
+                return scrape_id, stats
+
+            scrape_id = start_scrape(connection, travel_location)
+            store_pages(cached_pages)
+
+        #the scrape is only added to the analytics once every page has been saved
+        if scrape_id is not None:
+            record_analytics(connection, scrape_id)
+    finally:
+        connection.close()
+
+    if scrape_id is None:
+        raise NoResultsError(f"No properties were found for {travel_location}")
+
+    return scrape_id, stats
+
+#function that returns the id of the latest scrape of a location if it is the scrape the cached pages of a search were stored in, or None if it is not
+#the scrape must have been scraped (not migrated) no earlier than the first page was cached and hold as many properties as the cached pages -
+#a database the pages were never stored in, such as when the cache was filled by a search saved to another file, has no such scrape
+def get_cached_scrape_id(connection, travel_location, cached_at, properties):
+    row = connection.execute(
+        "SELECT id, scraped_at, source FROM scrapes WHERE location = ? ORDER BY scraped_at DESC, id DESC LIMIT 1",
+        (normalise_location(travel_location),),
+    ).fetchone()
+    if row is None:
+        return None
+
+    scrape_id, scraped_at, source = row
+    #scrape times are stored to the second, so the cache time is rounded down to the second to compare them
+    if source != "scrape" or datetime.fromisoformat(scraped_at).timestamp() < int(cached_at):
+        return None
+    if connection.execute("SELECT COUNT(*) FROM properties WHERE scrape_id = ?", (scrape_id,)).fetchone()[0] != properties:
+        return None
+    return scrape_id
+
+#function that creates a set of running statistics that can be updated one page at a time without keeping the pages
+def create_running_stats():
+    return {"pages": 0, "properties": 0, "rated": 0, "rating_total": 0.0, "priced": 0, "price_total": 0.0, "price_min": None, "price_max": None}
+
+#subroutine that adds a page of properties to a set of running statistics
+def update_running_stats(stats, page_data):
+    stats["pages"] += 1
+    for name_value, rating_value, rating_num, price, listing_id in page_data:
+        stats["properties"] += 1
+        if rating_value != "" and rating_value != 0:
+            stats["rated"] += 1
+            stats["rating_total"] += rating_value
+        if price != 0:
+            stats["priced"] += 1
+            stats["price_total"] += price
+            stats["price_min"] = price if stats["price_min"] is None else min(stats["price_min"], price)
+            stats["price_max"] = price if stats["price_max"] is None else max(stats["price_max"], price)
+
+#function that returns the mean rating and mean price of a set of running statistics
+def summarise_running_stats(stats):
+    return {
+        "pages": stats["pages"],
+        "properties": stats["properties"],
+        "mean_rating": stats["rating_total"] / stats["rated"] if stats["rated"] > 0 else None,
+        "mean_price": stats["price_total"] / stats["priced"] if stats["priced"] > 0 else None,
+        "min_price": stats["price_min"],
+        "max_price": stats["price_max"],
+    }
+
+#subroutine that prints the running statistics of a crawl - with only_changed they only cover the new or changed properties
+def print_running_stats(travel_location, stats, only_changed=False):
+    summary = summarise_running_stats(stats)
+    described = "new or changed properties" if only_changed else "properties"
+    line = f"{travel_location}: {summary['properties']} {described} on {summary['pages']} page(s)"
+    if summary["mean_rating"] is not None:
+        line += f", mean rating {summary['mean_rating']:.2f}"
+    if summary["mean_price"] is not None:
+        line += f", mean price £{summary['mean_price']:.2f} (£{summary['min_price']:,.0f}-£{summary['max_price']:,.0f})"
+    print(line)
+
+#function that collects the property data for a location using either the Selenium browser engine or the browser-free HTTP engine
+def scrape_location(travel_location, engine=SCRAPE_ENGINE, base_url=BASE_URL, pool=None, progress=None, cancel_event=None, max_pages=MAX_PAGES, force_refresh=False):
+    return collect_pages(stream_search(travel_location, engine, base_url, pool, max_pages, progress, cancel_event, force_refresh))
+
+#generator that searches for a location with the chosen engine and yields the properties found one page at a time as each page is scraped
+#pages found in the cache are yielded without scraping - the website is only visited, and the browser only started, for the first page that is not cached
+#if page_sources is given, the time each page was cached, or None for a page that was scraped, is appended to it before the page is yielded
+def stream_search(travel_location, engine=SCRAPE_ENGINE, base_url=BASE_URL, pool=None, max_pages=MAX_PAGES, progress=None, cancel_event=None, force_refresh=False, page_sources=None):
+    if engine not in ("http", "selenium"):
+        raise ValueError(f"Unknown scraping engine: {engine}")
+
+    #the search parameters that change the results, so a page cached for one search is not used for a different one
+    search_params = {"base_url": base_url}
+
+    #the listings already yielded, so a listing shown on more than one page is only yielded once
+    seen_ids = set()
+
+    page = 1
+    cached_cards = 0
+    if not force_refresh:
+        while max_pages is None or page <= max_pages:
+            cache_times = []
+            page_data = cache_get(travel_location, page, search_params, cache_times=cache_times)
+            if page_data is None:
+                break
+            #an empty cached page marks the end of the results
+            if page_data == []:
+                return
+            cached_cards += len(page_data)
+            report_progress(progress, page, cached_cards)
+            if page_sources is not None:
+                page_sources.append(cache_times[0])
+            yield drop_seen_listings(page_data, seen_ids)
+            page += 1
+        else:
+            return
+
+    #the progress of the pages that are scraped carries on from the cached pages
+    def live_progress(live_page, cards_parsed):
+        report_progress(progress, live_page, cached_cards + cards_parsed)
+
+    #stops straight away if searches for this location keep failing
+    check_circuit(travel_location)
+
+    if engine == "http":
+        live_pages = iter_pages_http(travel_location, base_url, max_pages=max_pages, progress=live_progress, cancel_event=cancel_event, start_page=page)
+    else:
+        live_pages = iter_pages_selenium(travel_location, base_url, pool, max_pages, live_progress, cancel_event, start_page=page)
 
+    #each page scraped is added to the cache as it arrives
+    try:
+        for page_data in live_pages:
+            cache_put(travel_location, page, search_params, page_data)
+            if page_sources is not None:
+                page_sources.append(None)
+            yield drop_seen_listings(page_data, seen_ids)
+            page += 1
+    except (SearchCancelled, NoResultsError):
+        raise
+    except Exception:
+        record_circuit_failure(travel_location)
+        raise
+    record_circuit_success(travel_location)
+
+    #if the results ran out before the page limit, the end of the results is cached so later searches do not look for more pages
+    if page > 1 and (max_pages is None or page <= max_pages):
+        cache_put(travel_location, page, search_params, [])
+
+#function that removes the properties whose listing has already been seen in a search and adds the rest to seen_ids
+#promoted listings are shown again on later pages, which would count them twice - properties without a listing id are always kept
+def drop_seen_listings(page_data, seen_ids):
+    new_page_data = []
+    for property_data in page_data:
+        listing_id = property_data[4]
+        if listing_id is not None:
+            if listing_id in seen_ids:
+                continue
+            seen_ids.add(listing_id)
+        new_page_data.append(property_data)
+
+    return new_page_data
+
+#the number of failed searches in a row for each location and the time searches for it were stopped, if they have been
+circuit_breakers = {}
+circuit_lock = threading.Lock()
+
+#function that raises CircuitOpenError if searches for a location have been stopped and the cooldown has not passed
+#once the cooldown has passed one more search is let through - if it fails too, searches are stopped again
+def check_circuit(travel_location):
+    with circuit_lock:
+        circuit = circuit_breakers.get(normalise_location(travel_location).lower())
+        if circuit is None or circuit["opened_at"] is None:
+            return
+        remaining = CIRCUIT_COOLDOWN - (time.time() - circuit["opened_at"])
+        if remaining > 0:
+            raise CircuitOpenError(f"Searches for {travel_location} have failed {circuit['failures']} times in a row - try again in {remaining:.0f}s")
+
+#subroutine that records a failed search for a location, stopping searches for it once too many have failed in a row
+def record_circuit_failure(travel_location):
+    with circuit_lock:
+        circuit = circuit_breakers.setdefault(normalise_location(travel_location).lower(), {"failures": 0, "opened_at": None})
+        circuit["failures"] += 1
+        if circuit["failures"] >= CIRCUIT_FAILURE_LIMIT:
+            circuit["opened_at"] = time.time()
+
+#subroutine that records a successful search for a location, clearing its failures
+def record_circuit_success(travel_location):
+    with circuit_lock:
+        circuit_breakers.pop(normalise_location(travel_location).lower(), None)
+
+#subroutine that waits before a retry - the delay doubles with each attempt up to RETRY_MAX_DELAY and a random amount is taken off (jitter) so retries do not all happen at once
+#the wait ends early if the search is cancelled
+def backoff_sleep(attempt, cancel_event=None):
+    delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (attempt - 1)))
+    if cancel_event is not None:
+        cancel_event.wait(delay)
+    else:
+        time.sleep(delay)
+    check_cancelled(cancel_event)
+
+#counts of how often a page was found in the cache (hits) or had to be scraped (misses)
+cache_stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+cache_lock = threading.Lock()
+#the total size in bytes of the pages in each cache folder - the folder is only listed the first time and when pages need to be evicted,
+#and the total is kept up to date as pages are written and removed, so writing a page does not take longer as the cache grows
+cache_sizes = {}
+
+#subroutine that adds one to a cache counter
+def count_cache(counter):
+    with cache_lock:
+        cache_stats[counter] += 1
+
+#function that returns a copy of the cache counters
+def get_cache_stats():
+    with cache_lock:
+        return dict(cache_stats)
+
+#function that adds change bytes to the total size of a cache folder and returns the new total, listing the folder if its size is not known yet
+#the total is kept against the full path of the folder, as the same relative path is a different folder when the working folder changes
+def update_cache_size(directory, change):
+    cache_key = os.path.abspath(directory)
+    with cache_lock:
+        if cache_key in cache_sizes:
+            cache_sizes[cache_key] += change
+        else:
+            cache_sizes[cache_key] = sum(entry.stat().st_size for entry in os.scandir(directory) if entry.name.endswith(".json"))
+        return cache_sizes[cache_key]
+
+#function that returns the path of the cache file for a page of results of a search
+#the key is made from the location (ignoring case and extra spaces), the page number and the search parameters
+def get_cache_path(travel_location, page, search_params, directory=CACHE_DIRECTORY):
+    key_data = json.dumps({"location": normalise_location(travel_location).lower(), "page": page, "params": search_params, "version": CACHE_VERSION}, sort_keys=True)
+    return os.path.join(directory, hashlib.sha256(key_data.encode()).hexdigest() + ".json")
+
+#function that returns the cached properties of a page of results, or None if the page is not cached or the cached copy is older than ttl seconds
+#if cache_times is given, the time the page was cached is appended to it when the page is found
+def cache_get(travel_location, page, search_params, ttl=CACHE_TTL, directory=CACHE_DIRECTORY, cache_times=None):
+    cache_path = get_cache_path(travel_location, page, search_params, directory)
+    try:
+        with open(cache_path, encoding="utf-8") as cache_file:
+            cache_entry = json.load(cache_file)
+    except (OSError, ValueError):
+        count_cache("misses")
+        return None
+
+    if time.time() - cache_entry["created"] > ttl:
+        #removes the expired page so it does not take up space in the cache
+        try:
+            page_size = os.path.getsize(cache_path)
+            os.remove(cache_path)
+            update_cache_size(directory, -page_size)
+        except OSError:
+            pass
+        count_cache("misses")
+        return None
+
+    count_cache("hits")
+    if cache_times is not None:
+        cache_times.append(cache_entry["created"])
+    return [tuple(card) for card in cache_entry["page_data"]]
+
+#subroutine that saves the properties of a page of results in the cache, then removes the oldest pages if the cache has grown too large
+def cache_put(travel_location, page, search_params, page_data, directory=CACHE_DIRECTORY, max_bytes=CACHE_MAX_BYTES):
+    os.makedirs(directory, exist_ok=True)
+    cache_path = get_cache_path(travel_location, page, search_params, directory)
+
+    #a page written again replaces the old copy, whose size no longer counts
+    try:
+        old_size = os.path.getsize(cache_path)
+    except OSError:
+        old_size = 0
+
+    #the page is written to a temporary file first and then moved into place so other threads never read a half-written page
+    temp_path = f"{cache_path}.{threading.get_ident()}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as cache_file:
+        json.dump({"created": time.time(), "location": travel_location, "page": page, "page_data": page_data}, cache_file)
+    new_size = os.path.getsize(temp_path)
+    os.replace(temp_path, cache_path)
+    count_cache("writes")
+
+    if update_cache_size(directory, new_size - old_size) > max_bytes:
+        evict_cache(directory, max_bytes)
+
+#subroutine that removes the least recently written pages from the cache until it is no larger than max_bytes
+#the folder is listed again, which also corrects the total size kept for it if another program has changed the cache
+def evict_cache(directory=CACHE_DIRECTORY, max_bytes=CACHE_MAX_BYTES):
+    cache_files = []
+    total_bytes = 0
+    for entry in os.scandir(directory):
+        if entry.name.endswith(".json"):
+            entry_stat = entry.stat()
+            cache_files.append((entry_stat.st_mtime, entry_stat.st_size, entry.path))
+            total_bytes += entry_stat.st_size
+
+    if total_bytes <= max_bytes:
+        with cache_lock:
+            cache_sizes[os.path.abspath(directory)] = total_bytes
+        return
+
+    cache_files.sort()
+    for modified_time, size, cache_path in cache_files:
+        if total_bytes <= max_bytes:
+            break
+        try:
+            os.remove(cache_path)
+        except OSError:
+            continue
+        total_bytes -= size
+        count_cache("evictions")
+
+    with cache_lock:
+        cache_sizes[os.path.abspath(directory)] = total_bytes
+
+#subroutine that removes every page from the cache
+def clear_cache(directory=CACHE_DIRECTORY):
+    if not os.path.isdir(directory):
+        return
+    for entry in os.scandir(directory):
+        if entry.name.endswith(".json"):
+            os.remove(entry.path)
+    with cache_lock:
+        cache_sizes[os.path.abspath(directory)] = 0
+
+#function that joins the pages yielded by one of the page generators into a dictionary of lists, or returns "" if no properties were found
+def collect_pages(pages):
+    all_page_data = []
+    for page_data in pages:
+        all_page_data += page_data
+
+    if all_page_data == []:
+        return ""
+
+    #converts the data collected from the Airbnb website into a dictionary of lists ready to be converted to a dataframe
+    return create_properties(all_page_data)
+
+#generator that borrows an Edge web driver from the driver pool, searches for the location on the website and yields the properties on each page of results
+#start_page skips the pages before it, which have already been read
+def iter_pages_selenium(travel_location, base_url=BASE_URL, pool=None, max_pages=MAX_PAGES, progress=None, cancel_event=None, start_page=1):
+    from selenium.common.exceptions import WebDriverException
+    if pool is None:
+        pool = get_driver_pool()
+
+    #tries the search up to RETRY_ATTEMPTS times until data is successfully accessed, waiting longer before each retry
+    for attempt in range(1, RETRY_ATTEMPTS + 1):
+        check_cancelled(cancel_event)
+        if attempt > 1:
+            backoff_sleep(attempt - 1, cancel_event)
+
+        yielded = False
+        try:
+            #borrows a browser session from the pool - it is reset and handed back to the pool when the search ends
+            with pool.lease() as driver:
+                #navigates to the stated URL in the Edge window
+                with timed_stage("page_load"):
+                    driver.get(base_url)
+
+                #calls a subroutine that automatically searches for the location input by the user on the Airbnb website
+                search_for_properties(driver, travel_location)
+
+                #waits for the results to show properties or a no results message - a search with no results is not tried again
+                results_state = wait_for_results(driver)
+                if results_state == "empty":
+                    raise NoResultsError(f"No properties were found for {travel_location}")
+
+                if results_state == "ready":
+                    #calls a generator that inspects elements of each page of results and retrieves data from them
+                    pages = iter_pages(driver, max_pages, progress=progress, cancel_event=cancel_event, start_page=start_page)
+                    first_page = next(pages, None)
+                    if first_page is not None:
+                        yielded = True
+                        yield first_page
+                        yield from pages
+                        return
+                    #when carrying on from a later page, no data means the results have run out
+                    if start_page > 1:
+                        return
+        except (WebDriverException, ScrapeFailedError) as error:
+            #a browser error after pages have been handed out cannot be retried without repeating them
+            if yielded:
+                raise
+            print(f"Search attempt {attempt} for {travel_location} failed: {getattr(error, 'msg', error)}")
+
+    raise ScrapeFailedError(f"The results for {travel_location} did not load after {RETRY_ATTEMPTS} attempts")
+
+#function that creates the options for how each web browser in the driver pool will function
+#with lean the browser records its network events so the requests it loads and the requests the lean profile blocks can be counted
+def create_driver_options(lean=LEAN_BROWSER):
+    from selenium.webdriver.edge.options import Options
     #allows application of certain options for how the web browser will function
     website_config = Options()
 
-    #prevents the web browser from automatically closing at the end of execution
-    website_config.add_experimental_option("detach", True)
-
     #prevents the web browser GUI from appearing to the user
     website_config.add_argument("--headless") #(Meshi, 2020)
-
-    #loops through setting up a web driver until data is successfully accessed through it
-    data_found = False
-    while data_found == False:
-        #sets up webdriver and opens an empty Edge window and assigns this to the 'driver' webdriver variable
-        driver = webdriver.Edge(options=website_config) #(Selenium, 2025)
-        #navigates to the stated URL in the Edge window
-        driver.get("https://www.airbnb.co.uk")
-        driver.maximize_window()
-
-        #calls a subroutine that automatically searches for the location input by the user on the Airbnb website
-        search_for_properties(driver, travel_location)
-        #calls a function that inspects elements of the web page and retrieves data from them to be analysed
-        property_data = get_data(driver)
-        #checks if any data was found
-        if property_data != "": data_found = True
-    
-    #declares a common filename to be used to store data for each location entered by the user, where each location is stored on separate sheets
-    filename = "property_data.xlsx"
-    #calls a function that saves the data as a dataframe into an excel file
-    data_sheet = save_data(property_data, travel_location, filename)
-    
-    #calls a function reads the contents of the file containing the data into a dataframe
-    property_df = load_data(filename, data_sheet)
-    
-    #calls a subroutine to provide analysis of the loaded property data
-    analyse_data(property_df, travel_location)
-
+    #sets the window size up front instead of maximising the window after it opens
+    website_config.add_argument(f"--window-size={WINDOW_SIZE[0]},{WINDOW_SIZE[1]}")
+
+    if lean:
+        #images are blocked by their URL patterns with the rest of the lean profile rather than by turning images off,
+        #so they are counted as blocked requests and the allow list can let single image patterns through
+        website_config.set_capability("ms:loggingPrefs", {"performance": "ALL"})
+
+    return website_config
+
+#function that returns the URL patterns the lean profile blocks, leaving out the kinds of resource and patterns in the allow list
+def get_blocked_patterns(allow_list=LEAN_ALLOW_LIST):
+    blocked_patterns = []
+    for resource_kind, patterns in LEAN_BLOCKED_RESOURCES.items():
+        if resource_kind in allow_list:
+            continue
+        blocked_patterns += [pattern for pattern in patterns if pattern not in allow_list]
+    return blocked_patterns
+
+#subroutine that makes a browser session block every request matching the lean profile's patterns, using the Chrome DevTools Protocol
+def apply_lean_profile(driver):
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": get_blocked_patterns()})
+
+#function that reads the network events a lean session has recorded since it was last read and returns the number of requests loaded,
+#the bytes they downloaded and the number of requests blocked - the blocked requests were never sent, so the bytes they would have used are not known
+def read_network_stats(driver):
+    from selenium.common.exceptions import WebDriverException
+    network_stats = {"requests_loaded": 0, "bytes_loaded": 0, "requests_blocked": 0}
+    try:
+        log_entries = driver.get_log("performance")
+    except WebDriverException:
+        return network_stats
+
+    for log_entry in log_entries:
+        event = json.loads(log_entry["message"])["message"]
+        if event["method"] == "Network.loadingFinished":
+            network_stats["requests_loaded"] += 1
+            network_stats["bytes_loaded"] += int(event["params"].get("encodedDataLength", 0))
+        elif event["method"] == "Network.loadingFailed" and event["params"].get("blockedReason") is not None:
+            network_stats["requests_blocked"] += 1
+
+    return network_stats
+
+#function that starts a headless Edge session with the given options
+def create_edge_driver(options):
+    from selenium import webdriver
+    #sets up webdriver and opens an empty Edge window and assigns this to the 'driver' webdriver variable
+    return webdriver.Edge(options=options) #(Selenium, 2025)
+
+#a pool of headless Edge sessions that are started once and lent out to searches instead of starting a new browser for every attempt
+#sessions are reset between searches, replaced if they stop responding and all shut down when the program exits
+#with lean every session uses the lean profile and the pool counts the requests its sessions load and block
+#driver_factory starts a session from the options made by options_factory
+class DriverPool:
+    def __init__(self, size=DRIVER_POOL_SIZE, options_factory=create_driver_options, lean=LEAN_BROWSER, driver_factory=create_edge_driver):
+        self.size = size
+        self.options_factory = options_factory
+        self.driver_factory = driver_factory
+        self.lean = lean
+        #sessions that are open but not currently lent out to a search
+        self.idle_drivers = []
+        #every session that is open, whether lent out or not
+        self.all_drivers = []
+        self.lock = threading.Lock()
+        #limits the number of sessions lent out at once to the size of the pool
+        self.slots = threading.Semaphore(size)
+        self.closed = False
+        #counts of how the pool has been used
+        self.stats = {"leases": 0, "sessions_created": 0, "sessions_recycled": 0}
+        if lean:
+            self.stats.update({"requests_loaded": 0, "bytes_loaded": 0, "requests_blocked": 0})
+
+    #lends a browser session to the code inside a with block and takes it back afterwards
+    @contextmanager
+    def lease(self):
+        from selenium.common.exceptions import WebDriverException
+        self.slots.acquire()
+        try:
+            driver = self.take_driver()
+            with self.lock:
+                self.stats["leases"] += 1
+            try:
+                yield driver
+            except WebDriverException:
+                #a browser error such as a wait timing out on a slow page leaves a working session, so the session is only replaced if it has stopped responding
+                if is_driver_alive(driver):
+                    self.give_back(driver)
+                else:
+                    self.recycle(driver)
+                raise
+            except BaseException:
+                self.give_back(driver)
+                raise
+            else:
+                self.give_back(driver)
+        finally:
+            self.slots.release()
+
+    #takes an idle session from the pool, or starts a new one if there are none, checking that it still responds
+    def take_driver(self):
+        while True:
+            with self.lock:
+                if self.closed:
+                    raise RuntimeError("The driver pool has been shut down")
+                driver = self.idle_drivers.pop() if self.idle_drivers != [] else None
+            if driver is None:
+                return self.start_driver()
+            if is_driver_alive(driver):
+                return driver
+            #the session has died since it was last used so it is closed and another one is tried
+            self.recycle(driver)
+
+    #starts a new headless session and adds it to the pool
+    @profiled("driver_startup")
+    def start_driver(self):
+        driver = self.driver_factory(self.options_factory(self.lean))
+        if self.lean:
+            try:
+                apply_lean_profile(driver)
+            except BaseException:
+                quit_driver(driver)
+                raise
+        with self.lock:
+            self.all_drivers.append(driver)
+            self.stats["sessions_created"] += 1
+        return driver
+
+    #clears the state left by a search and puts the session back in the pool, replacing it if it cannot be reset
+    def give_back(self, driver):
+        from selenium.common.exceptions import WebDriverException
+        #adds the requests made during the search to the pool's counts before the session is reset
+        if self.lean:
+            network_stats = read_network_stats(driver)
+            with self.lock:
+                for counter, value in network_stats.items():
+                    self.stats[counter] += value
+
+        try:
+            driver.delete_all_cookies()
+            driver.get("about:blank")
+        except WebDriverException:
+            self.recycle(driver)
+            return
+
+        with self.lock:
+            if self.closed:
+                quit_driver(driver)
+            else:
+                self.idle_drivers.append(driver)
+
+    #closes a broken session and removes it from the pool so a new one is started in its place
+    def recycle(self, driver):
+        quit_driver(driver)
+        with self.lock:
+            if driver in self.all_drivers:
+                self.all_drivers.remove(driver)
+            self.stats["sessions_recycled"] += 1
+
+    #closes every session in the pool
+    def shutdown(self):
+        with self.lock:
+            self.closed = True
+            drivers = self.all_drivers
+            self.all_drivers = []
+            self.idle_drivers = []
+        for driver in drivers:
+            quit_driver(driver)
+
+#function that checks if a browser session still responds to commands
+def is_driver_alive(driver):
+    from selenium.common.exceptions import WebDriverException
+    try:
+        driver.current_url
+        return True
+    except WebDriverException:
+        return False
+
+#function that closes a browser session, ignoring errors from sessions that have already died
+def quit_driver(driver):
+    from selenium.common.exceptions import WebDriverException
+    try:
+        driver.quit()
+    except WebDriverException:
+        pass
+
+#the driver pool shared by every Selenium search
+driver_pool = None
+driver_pool_lock = threading.Lock()
+
+#function that returns the shared driver pool, creating it the first time it is needed and making sure it is shut down when the program exits
+def get_driver_pool(size=DRIVER_POOL_SIZE):
+    global driver_pool
+    with driver_pool_lock:
+        if driver_pool is None:
+            driver_pool = DriverPool(size)
+            atexit.register(driver_pool.shutdown)
+    return driver_pool
+
+@profiled("search_for_properties")
 def search_for_properties(driver, location):
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions
 
     #finds the destination search element by its element ID (found by manually inspecting the element)
     dest_search_element = driver.find_element(by=By.ID, value="bigsearch-query-location-input") #(GeeksForGeeks, 2024d)
@@ -74,49 +1199,390 @@ def search_for_properties(driver, location):
 
 
 #a subroutine that inspects elements of the web and retrieves data from them
-def get_data(driver):
+#extraction can be "batch" (all cards read in a single script call) or "element" (one WebDriver call per element)
+def get_data(driver, extraction="batch", progress=None, cancel_event=None, max_pages=MAX_PAGES):
+    return collect_pages(iter_pages(driver, max_pages, extraction, progress, cancel_event))
+
+#generator that yields the data of the properties on each page of results, one page at a time, moving to the next page after each
+#stops when max_pages pages have been read (never, if max_pages is None), when a page has no properties or when there is no next page
+#pages before start_page are passed through without reading them
+def iter_pages(driver, max_pages=MAX_PAGES, extraction="batch", progress=None, cancel_event=None, start_page=1):
+    page = 1
+    cards_parsed = 0
+
+    #accept_preferences(driver)
+    while max_pages is None or page <= max_pages:
+        check_cancelled(cancel_event)
+
+        if page >= start_page:
+            #collects the data for every property on the current page using the chosen extraction mode
+            page_data = get_page_data(driver, extraction, cancel_event)
+            if page_data == []:
+                return
+
+            cards_parsed += len(page_data)
+            report_progress(progress, page, cards_parsed)
+            yield page_data
+
+        #selects next page button to show more property listings, unless this was the last page to be read
+        if max_pages is not None and page >= max_pages:
+            return
+        if not next_page(driver):
+            return
+        page += 1
+
+#function that collects the data for every property on the current page using the chosen extraction mode
+@profiled("extract_page")
+def get_page_data(driver, extraction="batch", cancel_event=None):
+    #checks once that the results have loaded, so each missing element only waits a short time instead of the full timeout
+    results_state = wait_for_results(driver)
+    if results_state == "empty":
+        return []
+    #a page that shows neither properties nor the no results message has not loaded or has been blocked, which is not the end of the results
+    if results_state == "timeout":
+        raise ScrapeFailedError("The page of results did not load")
+
+    page_data = None
+    if extraction == "batch":
+        page_data = get_page_data_batch(driver)
+    #falls back to reading each element individually if the batch script could not be run
+    if page_data is None:
+        page_data = get_page_data_per_element(driver, cancel_event, READY_ELEMENT_TIMEOUT)
+
+    return page_data
+
+#function that waits for a results page to finish loading and returns "ready" if it shows properties, "empty" if it shows the no results message
+#or "timeout" if it shows neither within the timeout, which usually means the scraper has been blocked
+@profiled("wait_for_results")
+def wait_for_results(driver, timeout=RESULTS_TIMEOUT):
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.common.exceptions import TimeoutException
+    first_name_path = f"{RESULTS_PATH}/div[1]/{NAME_SUBPATH}"
+
+    def results_state(driver):
+        if driver.find_elements(By.XPATH, first_name_path) != []:
+            return "ready"
+        if driver.find_elements(By.XPATH, NO_RESULTS_PATH) != []:
+            return "empty"
+        return False
+
+    try:
+        return WebDriverWait(driver, timeout, poll_frequency=0.25).until(results_state)
+    except TimeoutException:
+        return "timeout"
+
+#function that raises SearchCancelled if the search has been cancelled by the user
+def check_cancelled(cancel_event):
+    if cancel_event is not None and cancel_event.is_set():
+        raise SearchCancelled()
+
+#function that passes the current page and the number of properties parsed so far to the progress callback, if there is one
+def report_progress(progress, page, cards_parsed):
+    if progress is not None:
+        progress(page, cards_parsed)
+
+#function that stores the data of each property (a list of tuples) in a dictionary of lists, one list for each column of the dataframe
+def create_properties(page_data):
     #creates empty lists for each column heading of the dataframe (each different type of data of each property)
     name = []
     average_rating = []
     number_of_ratings = [] 
     price_per_night = []
+    listing_ids = []
+
+    for name_value, rating_value, rating_num, price, listing_id in page_data:
+        #appends the collected data to lists of the data for each type of data for each property
+        name.append(name_value)
+        average_rating.append(rating_value)
+        number_of_ratings.append(rating_num)
+        price_per_night.append(price)
+        listing_ids.append(listing_id)
 
-    #accept_preferences(driver)
-    #loops through the steps for the set number of pages
-    for page in range(1, 2):
-        #loops through the steps for collecting data for each property
-        for result_index in range(1, 18):
-            #gets the following data for the current property
-            name_value = get_property_name(driver, result_index)
-            #checks to see if name of property is found, if not moves onto the next property
-            if name_value != "":
-                rating_value, rating_num = get_ratings_and_reviews(driver, result_index)
-                price = get_price(driver, result_index)
-
-                #appends the collected data to lists of the data for each type of data for each property
-                name.append(name_value)
-                average_rating.append(rating_value)
-                number_of_ratings.append(rating_num)
-                price_per_night.append(price)
-            elif name_value == "" and page == 1 and result_index == 1:
-                return ""
-
-        #selects next page button to show more property listings
-        next_page(driver)
-
-    #stores the data collected from the Airbnb website stored in lists into a dictionary of lists ready to be converted to a dataframe
     properties = {
         "name": name,
         "average_rating": average_rating,
         "number_of_ratings": number_of_ratings,
         "price_per_night": price_per_night,
+        "listing_id": listing_ids,
     }
     return properties
 
+#function that collects the data of each property on the current page one element at a time and returns it as a list of tuples
+def get_page_data_per_element(driver, cancel_event=None, timeout=3):
+    page_data = []
+    #loops through the steps for collecting data for each property
+    for result_index in range(1, RESULTS_PER_PAGE + 1):
+        #each property can take several seconds to read so the search is checked for cancellation before each one
+        check_cancelled(cancel_event)
+        #gets the following data for the current property
+        name_value = get_property_name(driver, result_index, timeout)
+        #checks to see if name of property is found, if not moves onto the next property
+        if name_value != "":
+            rating_value, rating_num = get_ratings_and_reviews(driver, result_index, timeout)
+            price = get_price(driver, result_index, timeout)
+            listing_id = get_listing_id(driver, result_index)
+            page_data.append((name_value, rating_value, rating_num, price, listing_id))
+        elif result_index == 1:
+            #if the first property has no name then no results have loaded on the page
+            return []
+
+    return page_data
+
+#function that collects the data of every property on the current page with one script call, once the caller has waited for the results to load
+#returns None if the script could not be run so the caller can fall back to the per-element path
+def get_page_data_batch(driver):
+    from selenium.common.exceptions import JavascriptException
+    #the caller has already waited for the results to load, so the page is read straight away
+    try:
+        cards = driver.execute_script(CARD_SCRIPT, RESULTS_PATH, NAME_SUBPATH, RATING_SUBPATH, PRICE_SUBPATH, RESULTS_PER_PAGE, LISTING_LINK_SUBPATH)
+    except JavascriptException:
+        return None
+    if cards is None:
+        return None
+
+    return convert_cards(cards)
+
+#function that converts the name, rating and price text and the link of each property card into the values to be stored
+#a value of None means the element was not on the card
+def convert_cards(cards):
+    page_data = []
+    for card_index, (name_text, rating_text, price_text, link) in enumerate(cards):
+        #skips properties with no name in the same way as the per-element path
+        if not name_text:
+            if card_index == 0:
+                return []
+            continue
+
+        #a missing rating or price element gives 0 values, matching get_ratings_and_reviews and get_price
+        if rating_text is None:
+            rating_value, rating_num = 0, 0
+        else:
+            rating_value, rating_num = parse_rating_text(rating_text)
+        if price_text is None:
+            price = 0
+        else:
+            price = parse_price_text(price_text)
+
+        page_data.append((shorten_name(name_text), rating_value, rating_num, price, parse_listing_id(link)))
+
+    return page_data
+
+#function that returns the id of a listing from the link to its page (e.g. "/rooms/12345?adults=2") or from the id the website gives it
+#the website can give the id encoded as base64 text such as "DemandStayListing:12345" - None is returned if there is no id
+def parse_listing_id(link):
+    if link is None:
+        return None
+    link = str(link)
+
+    link_match = re.search(r"/rooms/(\d+)", link)
+    if link_match is not None:
+        return link_match.group(1)
+    if link.isdigit():
+        return link
+
+    try:
+        decoded_link = base64.b64decode(link, validate=True).decode("utf-8")
+    except ValueError:
+        return None
+    id_match = re.fullmatch(r"\w+:(\d+)", decoded_link)
+    return id_match.group(1) if id_match is not None else None
+
+#a single pooled HTTP session shared by every HTTP search so connections to the server are reused rather than opened for each request
+http_session = None
+http_session_lock = threading.Lock()
+
+#function that returns the shared HTTP session, creating it the first time it is needed
+#the lock stops batch workers that start at the same time from each creating a session
+def get_http_session():
+    import requests
+    from requests.adapters import HTTPAdapter
+    global http_session
+    with http_session_lock:
+        if http_session is None:
+            http_session = requests.Session()
+            #keeps a pool of open connections for each host so repeated searches do not have to reconnect
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+            http_session.mount("https://", adapter)
+            http_session.mount("http://", adapter)
+            http_session.headers.update(HTTP_HEADERS)
+    return http_session
+
+#function that returns the address of the search results page for a location
+def get_search_url(travel_location, base_url=BASE_URL):
+    return f"{base_url}/s/{quote(travel_location)}/homes"
+
+#generator that downloads each server-rendered search results page for a location in turn and yields the properties on it
+#stops when max_pages pages have been read (never, if max_pages is None), when a page has no properties or when there is no next page
+#pages before start_page are downloaded to find the link to the page after them but are not read
+def iter_pages_http(travel_location, base_url=BASE_URL, session=None, max_pages=MAX_PAGES, progress=None, cancel_event=None, start_page=1):
+    if session is None:
+        session = get_http_session()
+
+    url = get_search_url(travel_location, base_url)
+    page = 1
+    cards_parsed = 0
+    while url is not None and (max_pages is None or page <= max_pages):
+        response = fetch_page(session, url, cancel_event)
+
+        if page >= start_page:
+            #reads the property data out of the page in the same form as the Selenium path
+            page_data = parse_results_page(response.text)
+            if page_data == []:
+                return
+
+            cards_parsed += len(page_data)
+            report_progress(progress, page, cards_parsed)
+            yield page_data
+
+        url = get_next_page_url(response.text, response.url)
+        page += 1
+
+#function that downloads a page, retrying with increasing delays if the request fails or the server is busy or blocking requests
+@profiled("http_fetch")
+def fetch_page(session, url, cancel_event=None):
+    import requests
+    for attempt in range(1, RETRY_ATTEMPTS + 1):
+        check_cancelled(cancel_event)
+        if attempt > 1:
+            backoff_sleep(attempt - 1, cancel_event)
+
+        try:
+            response = session.get(url, timeout=HTTP_TIMEOUT)
+        except requests.RequestException as error:
+            print(f"Request attempt {attempt} for {url} failed: {error}")
+            continue
+        if response.status_code in RETRY_STATUS_CODES:
+            print(f"Request attempt {attempt} for {url} failed: HTTP {response.status_code}")
+            continue
+
+        response.raise_for_status()
+        return response
+
+    raise ScrapeFailedError(f"{url} could not be downloaded after {RETRY_ATTEMPTS} attempts")
+
+#function that returns the address of the next page of results linked from a search results page, or None if it is the last page
+#the cursor in the embedded page data is used if there is one, otherwise the link of the next page button
+def get_next_page_url(page_html, page_url):
+    import lxml.html
+    for page_state in get_embedded_states(page_html):
+        pagination = find_key(page_state, "paginationInfo")
+        if pagination is not None:
+            cursor = pagination.get("nextPageCursor")
+            if not cursor:
+                return None
+            return urljoin(page_url, f"?cursor={quote(cursor)}")
+
+    next_links = lxml.html.fromstring(page_html).xpath(NEXT_PAGE_PATH + "/@href")
+    if next_links == []:
+        return None
+    return urljoin(page_url, next_links[0])
+
+#function that reads the data of each property out of the HTML of a search results page
+#the listing data embedded in the page as JSON is used if there is any, otherwise the HTML is read using the same XPaths as the Selenium path
+@profiled("parse_page")
+def parse_results_page(page_html):
+    cards = get_embedded_cards(page_html)
+    if cards is None:
+        cards = get_html_cards(page_html)
+
+    return convert_cards(cards)
+
+#function that finds the listing data the server embeds in the page as JSON and returns the name, rating and price text and the id of each listing
+#returns None if the page has no embedded listing data
+def get_embedded_cards(page_html):
+    for page_state in get_embedded_states(page_html):
+        search_results = find_key(page_state, "searchResults", list)
+        if search_results is not None:
+            cards = []
+            for result in search_results[:RESULTS_PER_PAGE]:
+                listing = result.get("listing") or {}
+                name_text = listing.get("name") or result.get("subtitle") or ""
+                rating_text = result.get("avgRatingLocalized")
+                #the displayed price is the discounted price if there is one, otherwise the normal price
+                price_line = (result.get("structuredDisplayPrice") or {}).get("primaryLine") or {}
+                price_text = price_line.get("discountedPrice") or price_line.get("price")
+                cards.append([name_text.strip(), rating_text, price_text, listing.get("id")])
+            return cards
+
+    return None
+
+#generator that yields the page data the server embeds in a results page as JSON
+def get_embedded_states(page_html):
+    for script_text in re.findall(r'<script[^>]*id="data-deferred-state[^"]*"[^>]*>(.*?)</script>', page_html, re.DOTALL):
+        try:
+            yield json.loads(script_text)
+        except ValueError:
+            continue
+
+#function that searches through embedded page data for the first value of the given type stored under a key
+def find_key(page_state, key, value_type=dict):
+    if isinstance(page_state, dict):
+        if isinstance(page_state.get(key), value_type):
+            return page_state[key]
+        values = page_state.values()
+    elif isinstance(page_state, list):
+        values = page_state
+    else:
+        return None
+
+    for value in values:
+        found = find_key(value, key, value_type)
+        if found is not None:
+            return found
+    return None
+
+#function that reads the name, rating and price text and the link of each property card out of the HTML of the page using the same XPaths as the Selenium path
+def get_html_cards(page_html):
+    import lxml.html
+    page_tree = lxml.html.fromstring(page_html)
+    containers = page_tree.xpath(RESULTS_PATH)
+    if containers == []:
+        return []
+
+    cards = []
+    for card in containers[0].xpath("div")[:RESULTS_PER_PAGE]:
+        card_text = []
+        for subpath in (NAME_SUBPATH, RATING_SUBPATH, PRICE_SUBPATH):
+            elements = card.xpath(subpath)
+            if elements == []:
+                card_text.append(None)
+            else:
+                card_text.append(elements[0].text_content().strip())
+        links = card.xpath(LISTING_LINK_SUBPATH + "/@href")
+        card_text.append(links[0] if links != [] else None)
+        cards.append(card_text)
+
+    return cards
+
+#only one thread can write to the excel file at a time, as each write rewrites the whole file
+save_lock = threading.Lock()
+
+@profiled("save_data")
 def save_data(data, travel_location, filename):
+    import pandas as pd
     #creates a dataframe out of the data retrieved that was stored in a dictionary of lists
     property_df = pd.DataFrame(data) #(pandas, n.d. -b)
 
+    #calls a function to get the name of the sheet the location is saved in
+    sheet_name = get_sheet_name(travel_location)
+    
+    with save_lock:
+        #checks if the file already exists and sets the file open mode accordingly
+        if os.path.exists(filename):
+            #sets up a file writer to write the data collected to an excel file using the file open mode determined above - if a sheet with the same name exists already, it is replaced with a new one
+            with pd.ExcelWriter(filename, engine="openpyxl", mode="a", if_sheet_exists="replace") as data_writer:
+                #saves the data in a new excel sheet with name sheet_name - all property data stored in the same Excel file in separate sheets
+                property_df.to_excel(data_writer, sheet_name=sheet_name, index=False)
+        else:
+            with pd.ExcelWriter(filename, engine="openpyxl", mode="w") as data_writer:
+                #saves the data in a new excel file and sheet
+                property_df.to_excel(data_writer, sheet_name=sheet_name, index=False)
+
+    return sheet_name
+
+#function that returns the name of the excel sheet a location is saved in
+def get_sheet_name(travel_location):
     #declares a new string variable filename_location
     sheet_name = ""
     #iterates through the travel_location string (input by user)
@@ -128,125 +1594,504 @@ def save_data(data, travel_location, filename):
         else:
             sheet_name += char
     sheet_name += "_properties"
-    
-    #checks if the file already exists and sets the file open mode accordingly
-    if os.path.exists("property_data.xlsx"):
-        #sets up a file writer to write the data collected to an excel file using the file open mode determined above - if a sheet with the same name exists already, it is replaced with a new one
-        with pd.ExcelWriter(filename, engine="openpyxl", mode="a", if_sheet_exists="replace") as data_writer:
-            #saves the data in a new excel sheet with name sheet_name - all property data stored in the same Excel file in separate sheets
-            property_df.to_excel(data_writer, sheet_name=sheet_name, index=False)
-    else:
-        with pd.ExcelWriter(filename, engine="openpyxl", mode="w") as data_writer:
-            #saves the data in a new excel file and sheet
-            property_df.to_excel(data_writer, sheet_name=sheet_name, index=False)
 
     return sheet_name
 
+@profiled("load_data")
 def load_data(filename, data_sheet):
+    import pandas as pd
     df = pd.read_excel(filename, sheet_name=data_sheet)
     return df
 
+#function that saves the property data in the chosen storage format and returns where it was saved - the scrape id for "sqlite" or the sheet name for "xlsx"
+def persist_data(property_data, travel_location, storage=STORAGE_FORMAT, filename=None):
+    if storage == "sqlite":
+        return save_scrape(property_data, travel_location, filename or STORE_FILENAME)
+    elif storage == "xlsx":
+        return save_data(property_data, travel_location, filename or DATA_FILENAME)
+    else:
+        raise ValueError(f"Unknown storage format: {storage}")
+
+#function that reads data saved by persist_data back into a dataframe
+def load_persisted_data(saved_as, storage=STORAGE_FORMAT, filename=None):
+    if storage == "sqlite":
+        return load_scrape(saved_as, filename or STORE_FILENAME)
+    elif storage == "xlsx":
+        return load_data(filename or DATA_FILENAME, saved_as)
+    else:
+        raise ValueError(f"Unknown storage format: {storage}")
+
+#the tables of the property database - each scrape is one row of scrapes and its properties are rows of properties linked by scrape_id
+#listings is the index of every listing seen in each location, holding its latest values and when (and in which scrape) it was first seen, last seen and last changed
+#the indexes let the scrapes of a location be found without reading the rest of the database
+STORE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS scrapes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    location TEXT NOT NULL COLLATE NOCASE,
+    scraped_at TEXT NOT NULL,
+    source TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS scrapes_location_time ON scrapes (location, scraped_at);
+CREATE INDEX IF NOT EXISTS scrapes_time ON scrapes (scraped_at);
+CREATE TABLE IF NOT EXISTS properties (
+    scrape_id INTEGER NOT NULL REFERENCES scrapes (id),
+    name TEXT,
+    average_rating REAL,
+    number_of_ratings INTEGER,
+    price_per_night REAL,
+    listing_id TEXT
+);
+CREATE INDEX IF NOT EXISTS properties_scrape ON properties (scrape_id);
+CREATE TABLE IF NOT EXISTS listings (
+    location TEXT NOT NULL COLLATE NOCASE,
+    listing_id TEXT NOT NULL,
+    name TEXT,
+    average_rating REAL,
+    number_of_ratings INTEGER,
+    price_per_night REAL,
+    first_seen TEXT NOT NULL,
+    last_seen TEXT NOT NULL,
+    last_changed TEXT NOT NULL,
+    first_seen_scrape_id INTEGER,
+    last_seen_scrape_id INTEGER,
+    last_changed_scrape_id INTEGER,
+    PRIMARY KEY (location, listing_id)
+);
+"""
+#the indexes of the listings seen first and last in each scrape, created after older databases have been given the scrape id columns
+LISTING_INDEXES = """
+CREATE INDEX IF NOT EXISTS listings_first_seen_scrape ON listings (location, first_seen_scrape_id);
+CREATE INDEX IF NOT EXISTS listings_last_seen_scrape ON listings (location, last_seen_scrape_id);
+"""
+
+#function that opens the property database, creating its tables if they do not exist yet
+def open_store(filename=STORE_FILENAME):
+    #each call opens its own connection so the database can be used from several threads at once
+    connection = sqlite3.connect(filename, timeout=30)
+    #write-ahead logging lets searches read the database while another thread is appending to it
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.executescript(STORE_SCHEMA)
+    #databases created before listing ids were stored do not have the listing_id column yet
+    property_columns = [row[1] for row in connection.execute("PRAGMA table_info(properties)")]
+    if "listing_id" not in property_columns:
+        with connection:
+            connection.execute("ALTER TABLE properties ADD COLUMN listing_id TEXT")
+    #databases created before the listing index recorded scrape ids only have the times - the ids are filled in from the scrapes at those times
+    listing_columns = [row[1] for row in connection.execute("PRAGMA table_info(listings)")]
+    if "first_seen_scrape_id" not in listing_columns:
+        with connection:
+            for column in ("first_seen", "last_seen", "last_changed"):
+                connection.execute(f"ALTER TABLE listings ADD COLUMN {column}_scrape_id INTEGER")
+                connection.execute(
+                    f"UPDATE listings SET {column}_scrape_id = (SELECT MAX(id) FROM scrapes WHERE scrapes.location = listings.location AND scrapes.scraped_at = listings.{column})"
+                )
+    connection.executescript(LISTING_INDEXES)
+    return connection
+
+#function that returns a location in the form it is stored in the database, with surrounding and repeated spaces removed
+def normalise_location(travel_location):
+    return " ".join(travel_location.split())
+
+#function that appends the property data of one scrape to the database as a new timestamped batch and returns the id of the scrape
+#unlike save_data this only writes the new rows, so saving does not get slower as more locations and scrapes are stored
+@profiled("save_scrape")
+def save_scrape(data, travel_location, filename=STORE_FILENAME, scraped_at=None, source="scrape"):
+    #data from before listing ids were collected, such as old excel sheets, has no listing ids
+    listing_ids = data.get("listing_id", [None] * len(data["name"]))
+    page_data = zip(data["name"], data["average_rating"], data["number_of_ratings"], data["price_per_night"], listing_ids)
+
+    connection = open_store(filename)
+    try:
+        scrape_id = start_scrape(connection, travel_location, scraped_at, source)
+        append_properties(connection, scrape_id, page_data)
+        record_analytics(connection, scrape_id)
+    finally:
+        connection.close()
+
+    return scrape_id
+
+#function that adds a new timestamped scrape of a location to the database and returns its id
+def start_scrape(connection, travel_location, scraped_at=None, source="scrape"):
+    if scraped_at is None:
+        scraped_at = datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+    with connection:
+        cursor = connection.execute(
+            "INSERT INTO scrapes (location, scraped_at, source) VALUES (?, ?, ?)",
+            (normalise_location(travel_location), scraped_at, source),
+        )
+    return cursor.lastrowid
+
+#function that appends a page of properties (a list of tuples) to a scrape in the database and adds or updates their listings in the listing index, committing them straight away
+#every property is appended so the scrape is a full snapshot of the location - returns the properties, or with only_changed just the ones
+#whose listing is new or was in the index with a different name, rating or price
+@profiled("append_properties")
+def append_properties(connection, scrape_id, page_data, only_changed=False):
+    travel_location, scraped_at = connection.execute("SELECT location, scraped_at FROM scrapes WHERE id = ?", (scrape_id,)).fetchone()
+    page_data = list(page_data)
+
+    indexed_values = {}
+    if only_changed:
+        indexed_values = get_indexed_listings(connection, travel_location, [property_data[4] for property_data in page_data])
+
+    #properties without a rating are stored as empty (NULL) values, the same as empty cells in the excel file
+    rows = []
+    listing_rows = []
+    changed = []
+    for property_data in page_data:
+        name_value, rating_value, rating_num, price, listing_id = property_data
+        values = (name_value, none_if_empty(rating_value), none_if_empty(rating_num), none_if_empty(price))
+        rows.append((scrape_id, *values, listing_id))
+        if listing_id is not None:
+            listing_rows.append((travel_location, listing_id, *values, scraped_at, scraped_at, scraped_at, scrape_id, scrape_id, scrape_id))
+            if only_changed and indexed_values.get(listing_id) == values:
+                continue
+        changed.append(property_data)
+
+    with connection:
+        connection.executemany(
+            "INSERT INTO properties (scrape_id, name, average_rating, number_of_ratings, price_per_night, listing_id) VALUES (?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        #adds new listings to the index and updates the ones already in it, only moving last_changed on if the listing's values are different
+        connection.executemany(
+            "INSERT INTO listings (location, listing_id, name, average_rating, number_of_ratings, price_per_night, first_seen, last_seen, last_changed, "
+            "first_seen_scrape_id, last_seen_scrape_id, last_changed_scrape_id) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (location, listing_id) DO UPDATE SET "
+            "last_changed = CASE WHEN (name, average_rating, number_of_ratings, price_per_night) IS (excluded.name, excluded.average_rating, excluded.number_of_ratings, excluded.price_per_night) "
+            "THEN last_changed ELSE excluded.last_changed END, "
+            "last_changed_scrape_id = CASE WHEN (name, average_rating, number_of_ratings, price_per_night) IS (excluded.name, excluded.average_rating, excluded.number_of_ratings, excluded.price_per_night) "
+            "THEN last_changed_scrape_id ELSE excluded.last_changed_scrape_id END, "
+            "name = excluded.name, average_rating = excluded.average_rating, number_of_ratings = excluded.number_of_ratings, "
+            "price_per_night = excluded.price_per_night, last_seen = excluded.last_seen, last_seen_scrape_id = excluded.last_seen_scrape_id",
+            listing_rows,
+        )
+
+    return changed
+
+#function that returns the name, rating and price stored in the listing index for each of the listing ids of a location that are in it
+def get_indexed_listings(connection, travel_location, listing_ids):
+    listing_ids = [listing_id for listing_id in listing_ids if listing_id is not None]
+    if listing_ids == []:
+        return {}
+
+    placeholders = ", ".join("?" * len(listing_ids))
+    rows = connection.execute(
+        f"SELECT listing_id, name, average_rating, number_of_ratings, price_per_night FROM listings WHERE location = ? AND listing_id IN ({placeholders})",
+        (normalise_location(travel_location), *listing_ids),
+    )
+    return {row[0]: tuple(row[1:]) for row in rows}
+
+#function that returns the listing index of a location as a dataframe, with when each listing was first seen, last seen and last changed
+def load_listings(travel_location, filename=STORE_FILENAME):
+    import pandas as pd
+    connection = open_store(filename)
+    try:
+        return pd.read_sql_query(
+            "SELECT listing_id, name, average_rating, number_of_ratings, price_per_night, first_seen, last_seen, last_changed "
+            "FROM listings WHERE location = ? ORDER BY first_seen, listing_id",
+            connection,
+            params=(normalise_location(travel_location),),
+        )
+    finally:
+        connection.close()
+
+#subroutine that adds a finished scrape to the running price, rating and churn statistics of its location kept by PropertyAnalytics
+@profiled("record_analytics")
+def record_analytics(connection, scrape_id):
+    import PropertyAnalytics
+    PropertyAnalytics.record_scrape(connection, scrape_id)
+
+#function that converts empty or missing values to None so they are stored as NULL
+#NaN (how pandas marks an empty cell) is found by it not being equal to itself, so crawls that never use pandas do not have to import it
+def none_if_empty(value):
+    if value is None or value == "" or value != value:
+        return None
+    return value
+
+#function that reads the properties of a single scrape into a dataframe with the same columns as the excel sheets
+@profiled("load_scrape")
+def load_scrape(scrape_id, filename=STORE_FILENAME):
+    import pandas as pd
+    connection = open_store(filename)
+    try:
+        return pd.read_sql_query(
+            "SELECT name, average_rating, number_of_ratings, price_per_night, listing_id FROM properties WHERE scrape_id = ? ORDER BY rowid",
+            connection,
+            params=(scrape_id,),
+        )
+    finally:
+        connection.close()
+
+#function that returns the id of the most recent scrape of a location, or None if it has never been scraped
+def get_latest_scrape_id(travel_location, filename=STORE_FILENAME):
+    connection = open_store(filename)
+    try:
+        row = connection.execute(
+            "SELECT id FROM scrapes WHERE location = ? ORDER BY scraped_at DESC, id DESC LIMIT 1",
+            (normalise_location(travel_location),),
+        ).fetchone()
+    finally:
+        connection.close()
+
+    return row[0] if row is not None else None
+
+#function that reads the stored properties of a location into a dataframe
+#by default only the most recent scrape is returned - with latest=False every scrape is returned with the time it was scraped
+def load_location(travel_location, filename=STORE_FILENAME, latest=True):
+    import pandas as pd
+    if latest:
+        scrape_id = get_latest_scrape_id(travel_location, filename)
+        if scrape_id is None:
+            return pd.DataFrame(columns=["name", "average_rating", "number_of_ratings", "price_per_night", "listing_id"])
+        return load_scrape(scrape_id, filename)
+
+    connection = open_store(filename)
+    try:
+        return pd.read_sql_query(
+            "SELECT scrapes.scraped_at, properties.name, properties.average_rating, properties.number_of_ratings, properties.price_per_night, properties.listing_id "
+            "FROM scrapes JOIN properties ON properties.scrape_id = scrapes.id "
+            "WHERE scrapes.location = ? ORDER BY scrapes.scraped_at, scrapes.id, properties.rowid",
+            connection,
+            params=(normalise_location(travel_location),),
+        )
+    finally:
+        connection.close()
+
+#function that returns every location in the database
+def get_stored_locations(filename=STORE_FILENAME):
+    connection = open_store(filename)
+    try:
+        rows = connection.execute("SELECT DISTINCT location FROM scrapes ORDER BY location").fetchall()
+    finally:
+        connection.close()
+
+    return [row[0] for row in rows]
+
+#function that exports the most recent scrape of each location in the database to an excel file, one sheet per location as save_data does
+#the excel file is written once, only when an export is asked for - returns None without writing it if there are no locations to export
+def export_excel(excel_filename=DATA_FILENAME, filename=STORE_FILENAME, travel_locations=None):
+    import pandas as pd
+    if travel_locations is None:
+        travel_locations = get_stored_locations(filename)
+
+    #an excel file must have at least one sheet, so nothing is written if there are no locations to export
+    if travel_locations == []:
+        return None
+
+    with save_lock:
+        with pd.ExcelWriter(excel_filename, engine="openpyxl", mode="w") as data_writer:
+            for travel_location in travel_locations:
+                property_df = load_location(travel_location, filename)
+                property_df.to_excel(data_writer, sheet_name=get_sheet_name(travel_location), index=False)
+
+    return excel_filename
+
+#function that imports the per-location sheets of an existing excel file into the database
+#each sheet becomes one scrape dated with the time the excel file was last modified, and sheets that have already been imported are skipped
+def migrate_excel(excel_filename=DATA_FILENAME, filename=STORE_FILENAME):
+    import pandas as pd
+    scraped_at = datetime.fromtimestamp(os.path.getmtime(excel_filename), timezone.utc).isoformat(timespec="seconds")
+    source = f"migrated:{os.path.basename(excel_filename)}"
+
+    connection = open_store(filename)
+    try:
+        migrated = {row[0] for row in connection.execute("SELECT location FROM scrapes WHERE source = ?", (source,))}
+    finally:
+        connection.close()
+
+    imported = []
+    for sheet_name, property_df in pd.read_excel(excel_filename, sheet_name=None).items():
+        #only sheets written by save_data hold property data
+        if not sheet_name.endswith("_properties"):
+            continue
+        travel_location = sheet_name[:-len("_properties")].replace("_", " ")
+        if normalise_location(travel_location) in migrated:
+            continue
+
+        save_scrape(property_df.to_dict("list"), travel_location, filename, scraped_at, source)
+        imported.append(travel_location)
+
+    return imported
+
 #subroutine that initialises different visualisations of the data provided
-def analyse_data(property_df, travel_location):
-    #data munging - fills in null values (empty values) with 0
-    property_df.fillna(0, inplace=True)
+#the time taken to draw the graphs is recorded in timings, if given, before they are shown
+#it is also recorded as a stage of run, or of the current run if none is given
+def analyse_data(property_df, travel_location, timings=None, block=True, run=None):
+    import matplotlib.pyplot as plt
+    figure = plt.figure(figsize=(15, 7)) #(Bing Writer, 2025)
+    with timed_stage("analyse", run):
+        create_charts(property_df, travel_location, figure, timings)
+
+    #block is False when called from the GUI, whose own event loop keeps the window of graphs responsive
+    plt.show(block=block)
+
+#a single figure that the graphs of every location saved to a file are drawn on, so a new figure is not set up for each location
+chart_figure = None
+chart_lock = threading.Lock()
+
+#function that draws the graphs of the property data and saves them as an image in directory instead of showing them - returns the path of the image
+#the figure is not attached to pyplot or a window and is drawn with a non-interactive backend, so no display is needed
+def save_charts(property_df, travel_location, directory, timings=None, chart_format=CHART_FORMAT):
+    global chart_figure
+    from matplotlib.figure import Figure
+
+    if chart_format not in ("png", "svg"):
+        raise ValueError(f"Unknown chart format: {chart_format}")
+
+    os.makedirs(directory, exist_ok=True)
+    #the image is named after the location with anything that cannot be used in a filename replaced by "_"
+    chart_path = os.path.join(directory, re.sub(r"[^\w-]+", "_", normalise_location(travel_location)) + f"_properties.{chart_format}")
+
+    with chart_lock, timed_stage("analyse"):
+        if chart_figure is None:
+            chart_figure = Figure(figsize=(15, 7))
+        else:
+            chart_figure.clear()
+        create_charts(property_df, travel_location, chart_figure, timings)
+        chart_figure.savefig(chart_path, format=chart_format)
+
+    return chart_path
+
+#subroutine that prints the statistics of the property data and draws the graphs on the figure, ready to be shown or saved
+#when there are more than AGGREGATE_THRESHOLD properties the distributions are drawn instead of one bar per property, so drawing takes about as long for thousands of properties as for tens
+def create_charts(property_df, travel_location, figure, timings=None):
+    import pandas as pd
+    start_time = time.perf_counter()
+
+    #data munging - properties without a rating have "" in place of a number, so the numeric columns are converted and any empty values filled in with 0
+    #a copy is made so the dataframe passed in is left unchanged
+    property_df = property_df.copy()
+    for column in ("average_rating", "number_of_ratings", "price_per_night"):
+        property_df[column] = pd.to_numeric(property_df[column], errors="coerce").fillna(0)
 
     #prints basic statistical values from the dataframe to the user
     print(property_df.describe())
 
-    #sets up 3 areas in a single window for individual graphs to be displayed using matplotlib library
-    figure, graph = plt.subplots(1, 3, figsize=(15, 7)) #(Bing Writer, 2025)
+    #sets up 3 areas in the figure for individual graphs to be displayed using matplotlib library
+    graph = figure.subplots(1, 3)
 
     #calls various functions to create and return various graphs
-    graph[0] = rating_bar(property_df, travel_location, graph[0])
-    graph[1] = price_bar(property_df, travel_location, graph[1])
-    graph[2] = rating_num_pie(property_df, travel_location, graph[2])
+    if len(property_df) > AGGREGATE_THRESHOLD:
+        graph[0] = rating_histogram(property_df, travel_location, graph[0])
+        graph[1] = price_histogram(property_df, travel_location, graph[1])
+        graph[2] = top_listings_bar(property_df, travel_location, graph[2])
+    else:
+        graph[0] = rating_bar(property_df, travel_location, graph[0])
+        graph[1] = price_bar(property_df, travel_location, graph[1])
+        graph[2] = rating_num_pie(property_df, travel_location, graph[2])
 
-    plt.tight_layout()
+    figure.tight_layout()
 
-    plt.show()
+    if timings is not None:
+        timings["analyse"] = time.perf_counter() - start_time
 
 #function that causes the program to wait until a specified element has been loaded on the web page before trying to access it to prevent an error
-def get_element(driver, path):
+#timeout is the number of seconds to wait for the element
+def get_element(driver, path, timeout=3):
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions
+    from selenium.common.exceptions import TimeoutException, StaleElementReferenceException
     #creates a WebDriverWait
-    wait = WebDriverWait(driver, 3)
+    wait = WebDriverWait(driver, timeout)
 
     #form of error-handling - if element is not found, error is caught and moves onto the next element
     element = ""
+    start_time = time.perf_counter()
     try:
         #finds the element on the web page but waits until it is located before trying to assign it to a variable (element)
         element = wait.until(expected_conditions.element_to_be_clickable((By.XPATH, path)))
     except (TimeoutException, StaleElementReferenceException) as e:
         #timeout may occur if no element is found with this XPath and so "" is returned
         element = ""
+    #records how long the wait took and whether the time was wasted waiting for an element that was not there
+    record_element_wait(time.perf_counter() - start_time, element == "")
 
     #WebElement value or "" is returned depending on if the element was found or not
     return element
 
 #function that takes the driver variable and loop index as parameters then uses them to get the name of the current property and return it
-def get_property_name(driver, result_index):
+def get_property_name(driver, result_index, timeout=3):
 
     #the XPath of the element containing the name of the property
-    path = f"/html/body/div[5]/div/div/div[1]/div/div/div[2]/div[1]/main/div[2]/div/div[2]/div/div/div/div/div/div[{result_index}]/div/div[2]/div/div/div/div/div/div[2]/div[3]/span"
+    path = f"{RESULTS_PATH}/div[{result_index}]/{NAME_SUBPATH}"
 
     #the element containing the name value of the property is found and assigned to a variable after waiting for it to be located (calls function to do this)
-    name_element = get_element(driver, path)
+    name_element = get_element(driver, path, timeout)
         
     if name_element != '':
         #gets the text value of the name element using the getattr Python function
         name_value = getattr(name_element, "text")
 
-        #cuts the property name down to a finite number of characters to ensure it is readable in hte visualisations but still useful
-        short_name = ""
-        for char in range(0, len(name_value)):
-            if char < 16:
-                short_name += name_value[char]
-        short_name += "..."
+        #an empty name counts as no name, as it does on the batch path
+        if name_value == "":
+            return ""
 
-        #returns the name value of the property so it can be stored
-        return short_name
+        #returns the shortened name value of the property so it can be stored
+        return shorten_name(name_value)
     else: 
         return ""
 
+#function that cuts the property name down to a finite number of characters to ensure it is readable in the visualisations but still useful
+def shorten_name(name_value):
+    short_name = ""
+    for char in range(0, len(name_value)):
+        if char < 16:
+            short_name += name_value[char]
+    short_name += "..."
+
+    return short_name
+
 #function that takes the driver variable and loop index as parameters and uses them to get and return data about ratings and reviews
-def get_ratings_and_reviews(driver, result_index):
+def get_ratings_and_reviews(driver, result_index, timeout=3):
     
     #the XPath for the element containing the average rating and number of reviews
-    path = f"/html/body/div[5]/div/div/div[1]/div/div/div[2]/div[1]/main/div[2]/div/div[2]/div/div/div/div/div/div[{result_index}]/div/div[2]/div/div/div/div/div/div[2]/div[7]/span/span[3]"
+    path = f"{RESULTS_PATH}/div[{result_index}]/{RATING_SUBPATH}"
 
     #the element containing the average rating and number of reviews is found and assigned after waiting for it to be located (calls function above)
-    rating_element = get_element(driver, path)
+    rating_element = get_element(driver, path, timeout)
     
     #checks if element for ratings is found
     if rating_element != "":
         #calls a function to get the text value of the element if it exists and splits the string containing the average rating and number of reviews and assigns each part to a different variable
         string_rating_value, string_number_of_ratings = try_rating_review(rating_element)
-        
-        #checks if string_rating_value has a meaningful value
-        if string_rating_value != "":
-            #casts the average rating string to a float
-            rating_value = float(string_rating_value)
-        else:
-            #if there is no value, rating_value is assigned no value to prevent error
-            rating_value = string_rating_value
-        
-        #checks if string_number_of_ratings has a meaningful value
-        if string_number_of_ratings != "":
-            #removes the brackets from either side of the number of ratings string
-            string_number_of_ratings = string_number_of_ratings.split("(")[1]
-            string_number_of_ratings = string_number_of_ratings.split(")")[0]
-            #casts the number of ratings string to an integer
-            number_of_ratings = int(string_number_of_ratings)
-        else:
-            #if there is no value, number_of_ratings is assigned no value to prevent error
-            number_of_ratings = string_number_of_ratings
 
-        #returns the values so they can be stored
-        return rating_value, number_of_ratings
+        #converts the strings into the values to be stored
+        return convert_rating_review(string_rating_value, string_number_of_ratings)
     else:
         #if no element is found, 0 values are returned
         return 0, 0
 
+#function that takes the text of a ratings element (e.g. "4.85 (123)") and returns the average rating and number of reviews
+def parse_rating_text(rating_element_value):
+    return convert_rating_review(*split_rating_review(rating_element_value))
+
+#function that casts the average rating and number of reviews strings to numbers
+def convert_rating_review(string_rating_value, string_number_of_ratings):
+    #checks if string_rating_value has a meaningful value
+    if string_rating_value != "":
+        #casts the average rating string to a float
+        rating_value = float(string_rating_value)
+    else:
+        #if there is no value, rating_value is assigned no value to prevent error
+        rating_value = string_rating_value
+    
+    #checks if string_number_of_ratings has a meaningful value
+    if string_number_of_ratings != "":
+        #removes the brackets from either side of the number of ratings string
+        string_number_of_ratings = string_number_of_ratings.split("(")[1]
+        string_number_of_ratings = string_number_of_ratings.split(")")[0]
+        #removes the thousands separators and casts the number of ratings string to an integer
+        number_of_ratings = int(string_number_of_ratings.replace(",", ""))
+    else:
+        #if there is no value, number_of_ratings is assigned no value to prevent error
+        number_of_ratings = string_number_of_ratings
+
+    #returns the values so they can be stored
+    return rating_value, number_of_ratings
+
 def try_rating_review(rating_element):
 
     try:
@@ -256,6 +2101,9 @@ def try_rating_review(rating_element):
         #some properties may not have a rating value if there are less than 3 reviews
         rating_element_value = ""
 
+    return split_rating_review(rating_element_value)
+
+def split_rating_review(rating_element_value):
     #attempts to split the text into 2 strings (1 for average rating, 1 for number of reviews) - in some cases this is not possible, such as when the rating is replaced with "New" on the website
     try:
         rating, num_review = rating_element_value.split(" ")
@@ -266,45 +2114,83 @@ def try_rating_review(rating_element):
     return rating, num_review
 
 #function that gets the price per night of property with index result_index using the web driver and returns this price
-def get_price(driver, result_index):
+def get_price(driver, result_index, timeout=3):
     #the XPath for the element containing the price per night
-    path = f"/html/body/div[5]/div/div/div[1]/div/div/div[2]/div[1]/main/div[2]/div/div[2]/div/div/div/div/div/div[{result_index}]/div/div[2]/div/div/div/div/div/div[2]/div[6]/div[2]/div/div/span[1]"
+    path = f"{RESULTS_PATH}/div[{result_index}]/{PRICE_SUBPATH}"
 
     #calls a function to get the element after waiting for it to be loaded
-    price_element = get_element(driver, path)
+    price_element = get_element(driver, path, timeout)
 
     #checks if price element was found or not
     if price_element != "":
-        #gets the price text value of the price_element
-        string_price_value = getattr(price_element, "text")
-        #removes the extra chars of the string until just the number of the price in £ remains
-        string_price_value = string_price_value.split(" ")[0]
-
-        #removes any characters that are not numerical digits that the string_price_value could contain
-        formatted_price_value = ""
-        for char in string_price_value:
-            #if current character is , or £ then these are not appended to the final formatted price value so this can be converted to a float
-            if char != "," and char != "£":
-                formatted_price_value += char
-
-        #casts the string price value to a float
-        price_value = float(formatted_price_value)
-
-        return price_value
+        #gets the price text value of the price_element and converts it to a number
+        return parse_price_text(getattr(price_element, "text"))
     else:
         #if no element is found then 0 value is returned
         return 0
 
+#function that gets the id of the listing of property with index result_index from the link on its card, or None if the card has no link
+#the card has already loaded by the time this is called, so the link is looked for without waiting
+def get_listing_id(driver, result_index):
+    from selenium.webdriver.common.by import By
+    path = f"{RESULTS_PATH}/div[{result_index}]/{LISTING_LINK_SUBPATH}"
+
+    link_elements = driver.find_elements(By.XPATH, path)
+    if link_elements == []:
+        return None
+    return parse_listing_id(link_elements[0].get_attribute("href"))
+
+#function that takes the text of a price element (e.g. "£1,234 night") and returns the price as a float
+def parse_price_text(string_price_value):
+    #removes the extra chars of the string until just the number of the price in £ remains
+    string_price_value = string_price_value.split(" ")[0]
+
+    #removes any characters that are not numerical digits that the string_price_value could contain
+    formatted_price_value = ""
+    for char in string_price_value:
+        #if current character is , or £ then these are not appended to the final formatted price value so this can be converted to a float
+        if char != "," and char != "£":
+            formatted_price_value += char
+
+    #an empty price text has no value to convert
+    if formatted_price_value == "":
+        return 0
+
+    #casts the string price value to a float
+    price_value = float(formatted_price_value)
+
+    return price_value
+
+#function that moves to the next page of results and returns True, or returns False if there is no next page button (the last page)
+@profiled("next_page")
 def next_page(driver):
-    #the full XPath of the next page button
-    element_path = "/html/body/div[5]/div/div/div[1]/div/div/div[2]/div[1]/main/div[2]/div/div[3]/div/div/div/nav/div/a[5]"
-    #gets the element of the next page button and assigns it to a variable
-    next_page_button = get_element(driver, element_path)
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support.ui import WebDriverWait
+    from selenium.webdriver.support import expected_conditions
+    from selenium.common.exceptions import TimeoutException
+    #gets the element of the next page button and assigns it to a variable - the page has already loaded, so the last page does not wait long for a button that is not there
+    next_page_button = get_element(driver, NEXT_PAGE_PATH, READY_ELEMENT_TIMEOUT)
+    if next_page_button == "":
+        return False
+
+    #remembers the first property card so it can tell when the next page has replaced it
+    first_card = driver.find_elements(By.XPATH, f"{RESULTS_PATH}/div[1]")
+
     #simulates a click on the next page button to cause the next page to be displayed
     next_page_button.click()
 
+    #waits for the cards of the previous page to be removed so they are not read again
+    if first_card != []:
+        try:
+            WebDriverWait(driver, 5).until(expected_conditions.staleness_of(first_card[0]))
+        except TimeoutException:
+            pass
+
+    return True
+
 
 def rating_bar(property_df, travel_location, graph):
+    import numpy as np
     #gets the data from column 0 and assigns it to a list variable
     properties = property_df.iloc[:, 0] #(pandas, n.d. -a)
     #gets the data from the column called "average_rating" and assigns it to the ratings variable as a list
@@ -326,6 +2212,7 @@ def rating_bar(property_df, travel_location, graph):
     return graph
 
 def price_bar(property_df, travel_location, graph):
+    import numpy as np
     #gets the data from column 0 and assigns it to a list variable
     properties = property_df.iloc[:, 0]
     #gets the data from the column called "price_per_night" and assigns it to the ratings variable as a list
@@ -347,13 +2234,14 @@ def price_bar(property_df, travel_location, graph):
 
 
 def rating_num_pie(property_df, travel_location, graph):
+    import numpy as np
 
-    slice_num = 10
-
+    #takes up to the first TOP_LISTINGS properties by position, so it works however many rows there are and whatever the index of the dataframe is
+    first_properties = property_df.head(TOP_LISTINGS)
     #gets the data from column 0 and assigns it to a list variable
-    properties = property_df.iloc[0:slice_num+1, 0]
+    properties = list(first_properties.iloc[:, 0])
     #gets the data from the column called "number_of_ratings" and assigns it to the ratings variable as a list
-    rating_counts = property_df.loc[0:slice_num, "number_of_ratings"]
+    rating_counts = list(first_properties["number_of_ratings"])
 
     #creates a numpy array for the number of ratings
     x = np.array(rating_counts)
@@ -364,17 +2252,62 @@ def rating_num_pie(property_df, travel_location, graph):
     for i in range(0, len(properties)):
         label.append((properties[i], rating_counts[i]))
 
+    graph.set_title("Number of reviews of each property")
+    #a pie chart cannot be drawn when none of the properties have been reviewed
+    if x.sum() == 0:
+        graph.text(0.5, 0.5, "No reviews", ha="center", va="center")
+        graph.axis("off")
+        return graph
+
     #creates a pie chart from this data
     graph.pie(x, labels=label)
-    graph.set_title("Number of reviews of each property")
-    
+
+    return graph
+
+#function that draws a histogram of the average ratings of the rated properties
+def rating_histogram(property_df, travel_location, graph):
+    import numpy as np
+    #properties without a rating have a rating of 0 and are left out
+    ratings = property_df.loc[property_df["average_rating"] > 0, "average_rating"]
+
+    graph.hist(ratings, bins=np.linspace(1, 5, 17), color="red")
+    graph.set_title(f"Average ratings of {len(ratings)} rated properties in {travel_location}")
+    graph.set_xlabel("Average rating")
+    graph.set_ylabel("Number of properties")
+
+    return graph
+
+#function that draws a histogram of the prices per night of the properties
+def price_histogram(property_df, travel_location, graph):
+    #properties without a price have a price of 0 and are left out
+    prices = property_df.loc[property_df["price_per_night"] > 0, "price_per_night"]
+
+    graph.hist(prices, bins=30, color="green")
+    graph.set_title(f"Prices of {len(prices)} properties in {travel_location}")
+    graph.set_xlabel("Price per night (£)")
+    graph.set_ylabel("Number of properties")
+
+    return graph
+
+#function that draws a horizontal bar chart of the TOP_LISTINGS properties with the most reviews
+def top_listings_bar(property_df, travel_location, graph):
+    top_properties = property_df.nlargest(TOP_LISTINGS, "number_of_ratings")
+
+    #the most reviewed property is drawn at the top
+    graph.barh(range(len(top_properties)), top_properties["number_of_ratings"], color="blue")
+    graph.set_yticks(range(len(top_properties)), labels=top_properties.iloc[:, 0])
+    graph.invert_yaxis()
+    graph.set_title(f"Most reviewed properties in {travel_location}")
+    graph.set_xlabel("Number of reviews")
+
     return graph
 
 #deals with establishing the GUI for the user to interact with
 #creates the window to host the GUI
 def create_window():
+    import tkinter as tk
     window = tk.Tk()
-    window.geometry("400x150")
+    window.geometry("400x190")
     window.title("Airbnb Property Investigator")
 
     #calls a subroutine to create a title label
@@ -383,13 +2316,128 @@ def create_window():
     create_location_label(window)
     #calls a function to create an entry box for the user input location and returns an entry variable
     location_input = create_location_input(window)
+    #calls a function that creates a label to show the progress of the searches
+    status_label = create_status_label(window)
+    #sets up the background worker that searches run on so the window keeps responding during a search
+    searches = BackgroundSearches(window, status_label)
     #calls a subroutine to create a button that when pressed gets the contents of the entry box - hence passing the entry variable as a parameter
-    create_search_button(window, location_input)
+    create_search_button(window, location_input, searches)
+    #calls a subroutine to create a button that cancels the searches that are running or waiting
+    create_cancel_button(window, searches)
+
+    #cancels any searches still running when the window is closed
+    window.protocol("WM_DELETE_WINDOW", lambda: close_window(window, searches))
 
     return window
 
+#subroutine that cancels the searches and closes the window
+def close_window(window, searches):
+    searches.shutdown()
+    window.destroy()
+
+#runs searches one after another on a background thread so the GUI does not freeze while a search is running
+#the worker sends progress updates through a thread-safe queue which the Tk main loop reads, as Tk widgets can only be updated from the main thread
+class BackgroundSearches:
+    def __init__(self, window, status_label, engine=SCRAPE_ENGINE):
+        self.window = window
+        self.status_label = status_label
+        self.engine = engine
+        #a single worker thread, so further searches wait in the executor's queue until the current one has finished
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.updates = queue.Queue()
+        #the location, future and cancel event of every search that has not finished
+        self.searches = []
+        #starts checking the queue for updates from the worker
+        self.window.after(100, self.poll_updates)
+
+    #adds a search for a location to the queue of searches
+    def submit(self, travel_location):
+        if travel_location.strip() == "":
+            return
+        cancel_event = threading.Event()
+        self.updates.put(("queued", travel_location, len(self.searches) + 1))
+        future = self.executor.submit(self.search, travel_location, cancel_event)
+        self.searches.append((travel_location, future, cancel_event))
+
+    #runs on the worker thread - runs the search and sends its progress and result back to the main thread
+    def search(self, travel_location, cancel_event):
+        start_time = time.perf_counter()
+
+        def progress(page, cards_parsed):
+            self.updates.put(("progress", travel_location, page, cards_parsed, time.perf_counter() - start_time))
+
+        self.updates.put(("progress", travel_location, 1, 0, 0.0))
+        #the run is started on the worker thread so the optional cProfile profiler records the scraping
+        run = start_run(travel_location)
+        try:
+            property_df, timings, saved = run_search(travel_location, self.engine, progress, cancel_event)
+        except SearchCancelled:
+            finish_run(run)
+            self.updates.put(("cancelled", travel_location))
+        except Exception as error:
+            finish_run(run)
+            self.updates.put(("failed", travel_location, error))
+        else:
+            run.stop_profiler()
+            self.updates.put(("done", travel_location, property_df, time.perf_counter() - start_time, timings, run))
+            #reports when the data has finished saving in the background - the run is finished then so the save is included in its report
+            saved.add_done_callback(lambda future: self.updates.put(("saved", travel_location, future.exception(), timings, run)))
+
+    #cancels every search that is running or waiting to run
+    def cancel_all(self):
+        for travel_location, future, cancel_event in self.searches:
+            cancel_event.set()
+            #searches that have not started yet are removed from the queue straight away
+            if future.cancel():
+                self.updates.put(("cancelled", travel_location))
+        self.status_label.config(text="Cancelling searches...")
+
+    #stops the worker, cancelling any searches that have not finished
+    def shutdown(self):
+        self.cancel_all()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    #runs on the main thread - shows each update sent by the worker, then checks again after 100ms
+    def poll_updates(self):
+        #the next check is scheduled first so updates keep being shown even if showing this one takes a while
+        self.window.after(100, self.poll_updates)
+        try:
+            while True:
+                self.show_update(self.updates.get_nowait())
+        except queue.Empty:
+            pass
+
+        #forgets the searches that have finished
+        self.searches = [search for search in self.searches if not search[1].done()]
+
+    #displays an update from the worker in the status label
+    def show_update(self, update):
+        kind, travel_location = update[0], update[1]
+        if kind == "queued":
+            self.status_label.config(text=f"{travel_location}: queued ({update[2]} search(es) waiting or running)")
+        elif kind == "progress":
+            page, cards_parsed, elapsed = update[2], update[3], update[4]
+            self.status_label.config(text=f"{travel_location}: page {page}, {cards_parsed} properties, {elapsed:.1f}s")
+        elif kind == "cancelled":
+            self.status_label.config(text=f"{travel_location}: search cancelled")
+        elif kind == "failed":
+            self.status_label.config(text=f"{travel_location}: search failed - {update[2]}")
+        elif kind == "done":
+            property_df, elapsed, timings, run = update[2], update[3], update[4], update[5]
+            self.status_label.config(text=f"{travel_location}: {len(property_df)} properties found in {elapsed:.1f}s")
+            #the charts are drawn on the main thread as matplotlib and Tk are not thread-safe
+            #the run of the search is passed on as the current run may already belong to the next search
+            analyse_data(property_df, travel_location, timings, block=False, run=run)
+        elif kind == "saved":
+            error, timings, run = update[2], update[3], update[4]
+            if error is not None:
+                self.status_label.config(text=f"{travel_location}: saving failed - {error}")
+            print_stage_timings(travel_location, timings)
+            finish_run(run)
+
 #creates a title label to display at the top of the window
 def create_title_label(window):
+    import tkinter as tk
     title_label = tk.Label(
         window,
         text = "Airbnb Property Investigator",
@@ -403,6 +2451,7 @@ def create_title_label(window):
 
 #creates a label to display the string "Location:" in the GUI
 def create_location_label(window): #(GeeksForGeeks, 2024c)
+    import tkinter as tk
 
     location_label = tk.Label(
         window, 
@@ -416,6 +2465,7 @@ def create_location_label(window): #(GeeksForGeeks, 2024c)
 
 #creates an entry box for the user to enter the location they want to collect data about in the GUI
 def create_location_input(window): #(GeeksForGeeks, 2024b)
+    import tkinter as tk
     location_input = tk.Entry(
         window,
         width = 30,
@@ -425,15 +2475,43 @@ def create_location_input(window): #(GeeksForGeeks, 2024b)
     return location_input
 
 #creates a button the user can use to initiate the data collection and analysis from the GUI
-def create_search_button(window, location_input): #(GeeksForGeeks, 2024a)
+def create_search_button(window, location_input, searches): #(GeeksForGeeks, 2024a)
+    import tkinter as tk
     location_search = tk.Button( #
         window,
         height = 2,
         width = 10,
         text = "Search",
         #sets the command to be executed upon button click - lambda used to prevent execution before pressing button (without lambda if command assigned a procedure that takes a parameter it is executed when button declared)
-        command = lambda: initiate(location_input.get()) #(Crawley, 2018)
+        #the search is queued to run in the background rather than run straight away so the window does not freeze
+        command = lambda: searches.submit(location_input.get()) #(Crawley, 2018)
     )
     location_search.place(x = 300, y = 60)
 
-main()
+#creates a button that cancels the searches that are running or waiting to run
+def create_cancel_button(window, searches):
+    import tkinter as tk
+    cancel_search = tk.Button(
+        window,
+        height = 1,
+        width = 10,
+        text = "Cancel",
+        command = searches.cancel_all
+    )
+    cancel_search.place(x = 300, y = 110)
+
+#creates a label to show the progress of the current search in the GUI
+def create_status_label(window):
+    import tkinter as tk
+    status_label = tk.Label(
+        window,
+        text = "Enter a location and press Search",
+        height = 1,
+        width = 50,
+        anchor = "w"
+    )
+    status_label.place(x = 20, y = 155)
+    return status_label
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+#shared helpers for the tests - a driver that reads a saved page with lxml so the scraping functions can be tested without a browser
+import os
+import sys
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+from lxml import html
+from selenium.common.exceptions import NoSuchElementException
+from selenium.webdriver.common.by import By
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import TravelPropertyAnalysis as tpa
+
+FIXTURES_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+#function that returns the text of a saved page in the fixtures directory
+def read_fixture(filename):
+    with open(os.path.join(FIXTURES_DIRECTORY, filename), encoding="utf-8") as fixture_file:
+        return fixture_file.read()
+
+
+#an element of a saved page with the parts of the WebElement interface the scraper uses
+class FixtureElement:
+    def __init__(self, node):
+        self.node = node
+
+    @property
+    def text(self):
+        return self.node.text_content().strip()
+
+    def get_attribute(self, name):
+        return self.node.get(name)
+
+    def is_displayed(self):
+        return True
+
+    def is_enabled(self):
+        return True
+
+
+#a driver that finds elements on a saved page by XPath and runs CARD_SCRIPT in Python, as the browser would
+#the stand-in for CARD_SCRIPT reads the same XPaths in the same argument order (checked by test_card_script_arguments), but the
+#JavaScript itself is only run by the optional browser tests in test_browser.py
+class FixtureDriver:
+    def __init__(self, page_html):
+        self.tree = html.fromstring(page_html)
+
+    def find_elements(self, by, path):
+        assert by == By.XPATH
+        return [FixtureElement(node) for node in self.tree.xpath(path)]
+
+    def find_element(self, by, path):
+        elements = self.find_elements(by, path)
+        if elements == []:
+            raise NoSuchElementException(path)
+        return elements[0]
+
+    def execute_script(self, script, *arguments):
+        assert script == tpa.CARD_SCRIPT
+        results_path, name_path, rating_path, price_path, results_per_page, link_path = arguments
+        containers = self.tree.xpath(results_path)
+        if containers == []:
+            return None
+
+        cards = []
+        for card in containers[0].xpath("div")[:results_per_page]:
+            card_texts = []
+            for path in (name_path, rating_path, price_path):
+                nodes = card.xpath(path)
+                card_texts.append(nodes[0].text_content().strip() if nodes else None)
+            links = card.xpath(link_path)
+            cards.append(card_texts + [links[0].get("href") if links else None])
+        return cards
+
+
+@pytest.fixture
+def results_driver():
+    return FixtureDriver(read_fixture("results_page.html"))
+
+
+#a local HTTP server that serves the saved results pages - the first page for a search and the second for its cursor
+@pytest.fixture
+def embedded_site():
+    pages = {None: read_fixture("embedded_page_1.html"), "Y3Vyc29yOjE4": read_fixture("embedded_page_2.html")}
+
+    class EmbeddedHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            cursor = parse_qs(urlparse(self.path).query).get("cursor", [None])[0]
+            body = pages.get(cursor)
+            if body is None:
+                self.send_error(404)
+                return
+            body = body.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *arguments):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), EmbeddedHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+    server.server_close()
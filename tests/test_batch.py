@@ -0,0 +1,63 @@
+#tests of scraping several locations at once against the benchmark's local fixture site
+import pandas as pd
+import pytest
+
+import PropertyBenchmark
+import TravelPropertyAnalysis as tpa
+
+
+#a fixture site that is always too busy to serve the results of one location
+class PartlyBrokenSite(PropertyBenchmark.FixtureSite):
+    def get_page(self, path):
+        if path.startswith("/s/Nowhere/"):
+            return 503, "text/html; charset=utf-8", "<html><body>Service unavailable</body></html>"
+        return super().get_page(path)
+
+
+@pytest.fixture
+def fixture_site(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(tpa, "RETRY_BASE_DELAY", 0.01)
+    monkeypatch.setattr(tpa, "circuit_breakers", {})
+    site = PartlyBrokenSite(pages=2, cards=4)
+    site.start()
+    yield site
+    site.stop()
+
+
+@pytest.mark.parametrize("storage", ["sqlite", "xlsx"])
+def test_failed_location_does_not_stop_the_others(fixture_site, tmp_path, storage):
+    filename = str(tmp_path / ("batch.db" if storage == "sqlite" else "batch.xlsx"))
+    travel_locations = ["Paris", "Nowhere", "Rome", "Oslo"]
+
+    results = tpa.scrape_locations(travel_locations, "http", max_workers=3, filename=filename, base_url=fixture_site.url, storage=storage, max_pages=None)
+
+    assert set(results["saved"]) == {"Paris", "Rome", "Oslo"}
+    assert set(results["failed"]) == {"Nowhere"}
+    assert isinstance(results["failed"]["Nowhere"], tpa.ScrapeFailedError)
+    assert results["locations_per_minute"] > 0
+    for travel_location in results["saved"]:
+        property_df = tpa.load_persisted_data(results["saved"][travel_location], storage, filename)
+        assert len(property_df) == 8
+
+    if storage == "xlsx":
+        assert sorted(pd.ExcelFile(filename).sheet_names) == sorted(tpa.get_sheet_name(travel_location) for travel_location in ["Paris", "Rome", "Oslo"])
+
+
+def test_http_session_is_shared(monkeypatch):
+    monkeypatch.setattr(tpa, "http_session", None)
+    barrier = tpa.threading.Barrier(4)
+    sessions = []
+
+    def get_session():
+        barrier.wait()
+        sessions.append(tpa.get_http_session())
+
+    threads = [tpa.threading.Thread(target=get_session) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(sessions) == 4
+    assert all(session is sessions[0] for session in sessions)
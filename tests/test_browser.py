@@ -0,0 +1,44 @@
+#tests that need a real headless Edge browser - they are skipped where Edge and its driver are not installed
+import pathlib
+import shutil
+
+import pytest
+
+import PropertyBenchmark
+
+requires_edge = pytest.mark.skipif(shutil.which("msedgedriver") is None, reason="needs Microsoft Edge and msedgedriver")
+
+
+@requires_edge
+def test_lean_profile_blocks_fixture_resources():
+    comparison = PropertyBenchmark.compare_lean_profile(locations=1, pages=1, cards=3, latency=0.0)
+
+    assert comparison["lean"]["total_listings"] == comparison["full"]["total_listings"] == 3
+    assert comparison["avoided_requests"] > 0
+    assert comparison["avoided_bytes"] > 0
+    assert comparison["lean"]["browser_network"]["requests_blocked"] > 0
+
+
+#a headless Edge session that has opened the saved results page
+@pytest.fixture
+def browser_driver():
+    from selenium import webdriver
+    import TravelPropertyAnalysis as tpa
+    from conftest import FIXTURES_DIRECTORY
+
+    driver = webdriver.Edge(options=tpa.create_driver_options(lean=False))
+    try:
+        driver.get(pathlib.Path(FIXTURES_DIRECTORY, "results_page.html").as_uri())
+        yield driver
+    finally:
+        driver.quit()
+
+
+@requires_edge
+def test_card_script_matches_per_element(browser_driver):
+    import TravelPropertyAnalysis as tpa
+
+    batch_data = tpa.get_page_data_batch(browser_driver)
+
+    assert batch_data == tpa.get_page_data_per_element(browser_driver, timeout=0)
+    assert [property_data[4] for property_data in batch_data] == ["101", "103", "104", None]
@@ -0,0 +1,68 @@
+#tests of the on-disk cache of pages of results
+import os
+
+import TravelPropertyAnalysis as tpa
+
+SEARCH_PARAMS = {"base_url": "https://www.airbnb.co.uk/"}
+PAGE_DATA = [("A...", 4.5, 10, 50.0, "1"), ("B...", "", "", 80.0, "2")]
+
+
+def test_pages_are_cached_by_location_and_counted(tmp_path):
+    stats_before = tpa.get_cache_stats()
+
+    assert tpa.cache_get("Paris", 1, SEARCH_PARAMS, directory=tmp_path) is None
+    tpa.cache_put("Paris", 1, SEARCH_PARAMS, PAGE_DATA, directory=tmp_path)
+    #the location is matched ignoring case and extra spaces
+    assert tpa.cache_get("  paris ", 1, SEARCH_PARAMS, directory=tmp_path) == PAGE_DATA
+    assert tpa.cache_get("Paris", 2, SEARCH_PARAMS, directory=tmp_path) is None
+    assert tpa.cache_get("Paris", 1, {"base_url": "http://127.0.0.1/"}, directory=tmp_path) is None
+
+    stats = tpa.get_cache_stats()
+    assert stats["hits"] - stats_before["hits"] == 1
+    assert stats["misses"] - stats_before["misses"] == 3
+    assert stats["writes"] - stats_before["writes"] == 1
+
+
+def test_expired_pages_are_removed(tmp_path):
+    tpa.cache_put("Paris", 1, SEARCH_PARAMS, PAGE_DATA, directory=tmp_path)
+
+    assert tpa.cache_get("Paris", 1, SEARCH_PARAMS, ttl=-1, directory=tmp_path) is None
+    assert os.listdir(tmp_path) == []
+
+
+def test_oldest_pages_are_evicted(tmp_path):
+    for page in range(1, 4):
+        tpa.cache_put("Paris", page, SEARCH_PARAMS, PAGE_DATA, directory=tmp_path)
+        cache_path = tpa.get_cache_path("Paris", page, SEARCH_PARAMS, tmp_path)
+        os.utime(cache_path, (page, page))
+    page_size = os.path.getsize(cache_path)
+    evictions_before = tpa.get_cache_stats()["evictions"]
+
+    #the pages differ in size by a few bytes as each holds the time it was written, so the limit leaves room for that
+    tpa.cache_put("Paris", 4, SEARCH_PARAMS, PAGE_DATA, directory=tmp_path, max_bytes=page_size * 2 + page_size // 2)
+
+    cached_pages = [page for page in range(1, 5) if tpa.cache_get("Paris", page, SEARCH_PARAMS, directory=tmp_path) is not None]
+    assert cached_pages == [3, 4]
+    assert tpa.get_cache_stats()["evictions"] - evictions_before == 2
+
+
+def test_clear_cache(tmp_path):
+    tpa.cache_put("Paris", 1, SEARCH_PARAMS, PAGE_DATA, directory=tmp_path)
+    tpa.clear_cache(tmp_path)
+
+    assert os.listdir(tmp_path) == []
+    assert tpa.cache_get("Paris", 1, SEARCH_PARAMS, directory=tmp_path) is None
+
+
+def test_cached_pages_are_used_unless_refreshing(embedded_site, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    search_params = {"base_url": embedded_site}
+    cached_page = [("Cached...", 4.0, 1, 10.0, "9001")]
+    tpa.cache_put("Lisbon", 1, search_params, cached_page)
+    tpa.cache_put("Lisbon", 2, search_params, [])
+
+    assert list(tpa.stream_search("Lisbon", "http", embedded_site, max_pages=None)) == [cached_page]
+    refreshed_pages = list(tpa.stream_search("Lisbon", "http", embedded_site, max_pages=None, force_refresh=True))
+    assert [len(page_data) for page_data in refreshed_pages] == [3, 2]
+    #the pages scraped replace the cached ones
+    assert tpa.cache_get("Lisbon", 1, search_params) == refreshed_pages[0]
@@ -0,0 +1,79 @@
+#tests of drawing the graphs of a location and saving them as images without a display
+import matplotlib
+import pandas as pd
+import pytest
+from matplotlib.figure import Figure
+from matplotlib.patches import Wedge
+
+import TravelPropertyAnalysis as tpa
+
+matplotlib.use("Agg")
+
+
+#function that returns a dataframe of count made up properties with the columns that save_data writes
+def make_properties(count, number_of_ratings=None):
+    if number_of_ratings is None:
+        number_of_ratings = [index * 3 for index in range(count)]
+    return pd.DataFrame({
+        "name": [f"Property {index}..." for index in range(count)],
+        "average_rating": [4 + (index % 10) / 10 if index % 7 else "" for index in range(count)],
+        "number_of_ratings": number_of_ratings,
+        "price_per_night": [40.0 + index for index in range(count)],
+        "listing_id": [str(index) for index in range(count)],
+    })
+
+
+@pytest.fixture(autouse=True)
+def new_chart_figure(monkeypatch):
+    monkeypatch.setattr(tpa, "chart_figure", None)
+
+
+@pytest.mark.parametrize("count, first_title", [(tpa.AGGREGATE_THRESHOLD, "Average ratings of each property in Paris"),
+                                                (tpa.AGGREGATE_THRESHOLD + 1, "Average ratings of 43 rated properties in Paris")])
+def test_large_locations_are_aggregated(tmp_path, count, first_title):
+    chart_path = tpa.save_charts(make_properties(count), "Paris", str(tmp_path), chart_format="svg")
+
+    assert chart_path == str(tmp_path / "Paris_properties.svg")
+    assert (tmp_path / "Paris_properties.svg").stat().st_size > 0
+    titles = [graph.get_title() for graph in tpa.chart_figure.axes]
+    assert titles[0] == first_title
+    if count > tpa.AGGREGATE_THRESHOLD:
+        assert titles[2] == "Most reviewed properties in Paris"
+        assert len(tpa.chart_figure.axes[2].patches) == tpa.TOP_LISTINGS
+    else:
+        assert titles[2] == "Number of reviews of each property"
+
+
+def test_figure_is_reused(tmp_path):
+    tpa.save_charts(make_properties(5), "Paris", str(tmp_path))
+    figure = tpa.chart_figure
+    tpa.save_charts(make_properties(5), "New York", str(tmp_path))
+
+    assert tpa.chart_figure is figure
+    #the graphs of the first location are cleared rather than drawn over
+    assert len(figure.axes) == 3
+    assert figure.axes[0].get_title() == "Average ratings of each property in New York"
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["New_York_properties.png", "Paris_properties.png"]
+
+
+def test_unknown_chart_format(tmp_path):
+    with pytest.raises(ValueError):
+        tpa.save_charts(make_properties(5), "Paris", str(tmp_path), chart_format="jpg")
+
+
+def test_pie_of_fewer_properties_than_top_listings():
+    graph = Figure().subplots()
+    tpa.rating_num_pie(make_properties(4), "Paris", graph)
+
+    wedges = [patch for patch in graph.patches if isinstance(patch, Wedge)]
+    assert len(wedges) == 4
+    assert [text.get_text() for text in graph.texts] == ["('Property 0...', 0)", "('Property 1...', 3)", "('Property 2...', 6)", "('Property 3...', 9)"]
+
+
+def test_pie_without_reviews():
+    graph = Figure().subplots()
+    tpa.rating_num_pie(make_properties(4, number_of_ratings=[0, 0, 0, 0]), "Paris", graph)
+
+    assert [patch for patch in graph.patches if isinstance(patch, Wedge)] == []
+    assert [text.get_text() for text in graph.texts] == ["No reviews"]
+    assert not graph.axison
@@ -0,0 +1,61 @@
+#tests of the command line arguments and the exit status of running without the GUI
+import pandas as pd
+import pytest
+
+import TravelPropertyAnalysis as tpa
+
+
+@pytest.mark.parametrize("arguments", [["--pages", "-1"], ["--pages", "two"], ["--workers", "0"], ["--workers", "-3"]])
+def test_invalid_counts_are_rejected(arguments, capsys):
+    with pytest.raises(SystemExit) as error:
+        tpa.parse_arguments(["Paris"] + arguments)
+
+    assert error.value.code == 2
+    assert arguments[0] in capsys.readouterr().err
+
+
+def test_zero_pages_is_every_page():
+    options = tpa.parse_arguments(["Paris", "--pages", "0", "--workers", "1"])
+
+    assert options.pages == 0
+    assert options.workers == 1
+
+
+def test_migrate_and_export_without_locations(tmp_path, monkeypatch):
+    monkeypatch.setattr(tpa, "create_window", None)
+    excel_filename = str(tmp_path / "properties.xlsx")
+    filename = str(tmp_path / "store.db")
+    export_filename = str(tmp_path / "export.xlsx")
+    property_df = pd.DataFrame({"name": ["A...", "B..."], "average_rating": [4.5, 4.8], "number_of_ratings": [10, 20], "price_per_night": [50.0, 80.0], "listing_id": ["1", "2"]})
+    with pd.ExcelWriter(excel_filename, engine="openpyxl") as data_writer:
+        property_df.to_excel(data_writer, sheet_name=tpa.get_sheet_name("New York"), index=False)
+
+    assert tpa.main(["--output", filename, "--migrate", excel_filename, "--export", export_filename]) == 0
+
+    exported = pd.read_excel(export_filename, sheet_name=None, dtype={"listing_id": str})
+    assert list(exported) == [tpa.get_sheet_name("New York")]
+    assert list(exported[tpa.get_sheet_name("New York")]["listing_id"]) == ["1", "2"]
+
+
+def test_export_of_an_empty_database_fails(tmp_path, monkeypatch):
+    monkeypatch.setattr(tpa, "create_window", None)
+
+    assert tpa.main(["--output", str(tmp_path / "empty.db"), "--export", str(tmp_path / "export.xlsx")]) == 1
+
+
+def test_failed_location_sets_the_exit_status(tmp_path, monkeypatch):
+    searched = {}
+
+    def scrape_and_save(travel_location, engine, filename, base_url, pool, **options):
+        searched[travel_location] = options
+        if travel_location == "Nowhere":
+            raise tpa.NoResultsError(travel_location)
+        return 1
+
+    monkeypatch.setattr(tpa, "scrape_and_save", scrape_and_save)
+    filename = str(tmp_path / "store.db")
+
+    assert tpa.main(["Paris", "Rome", "--engine", "http", "--output", filename, "--pages", "0"]) == 0
+    assert searched["Paris"] == {"storage": "sqlite", "max_pages": None, "force_refresh": False, "only_changed": False}
+    assert tpa.main(["Paris", "Nowhere", "--engine", "http", "--output", filename, "--refresh"]) == 1
+    assert searched["Nowhere"]["force_refresh"]
@@ -0,0 +1,129 @@
+#tests of the driver pool's leases, resets, recycling and shutdown using sessions that do not start a browser
+import json
+
+import pytest
+from selenium.common.exceptions import TimeoutException, WebDriverException
+
+import TravelPropertyAnalysis as tpa
+
+
+#a browser session that records what the pool does with it and can be made to stop responding
+class FakeDriver:
+    def __init__(self, options):
+        self.options = options
+        self.alive = True
+        self.quit_called = False
+        self.visited = []
+        self.cdp_commands = []
+        self.log_entries = []
+
+    @property
+    def current_url(self):
+        if not self.alive:
+            raise WebDriverException("session deleted")
+        return self.visited[-1] if self.visited else "about:blank"
+
+    def get(self, url):
+        if not self.alive:
+            raise WebDriverException("session deleted")
+        self.visited.append(url)
+
+    def delete_all_cookies(self):
+        if not self.alive:
+            raise WebDriverException("session deleted")
+
+    def quit(self):
+        self.quit_called = True
+
+    def execute_cdp_cmd(self, command, parameters):
+        self.cdp_commands.append((command, parameters))
+
+    def get_log(self, log_type):
+        log_entries, self.log_entries = self.log_entries, []
+        return log_entries
+
+
+def create_pool(size=1, lean=False):
+    drivers = []
+
+    def driver_factory(options):
+        drivers.append(FakeDriver(options))
+        return drivers[-1]
+
+    return tpa.DriverPool(size, lean=lean, driver_factory=driver_factory), drivers
+
+
+def test_sessions_are_reused_and_reset():
+    pool, drivers = create_pool()
+    for _ in range(3):
+        with pool.lease() as driver:
+            driver.get("https://www.airbnb.co.uk/")
+
+    assert len(drivers) == 1
+    assert drivers[0].visited[-1] == "about:blank"
+    assert pool.stats == {"leases": 3, "sessions_created": 1, "sessions_recycled": 0}
+
+
+def test_browser_error_keeps_a_working_session():
+    pool, drivers = create_pool()
+    with pytest.raises(TimeoutException):
+        with pool.lease():
+            raise TimeoutException("slow page")
+    with pool.lease() as driver:
+        assert driver is drivers[0]
+
+    assert pool.stats["sessions_recycled"] == 0
+    assert not drivers[0].quit_called
+
+
+def test_dead_session_is_recycled():
+    pool, drivers = create_pool()
+    with pytest.raises(WebDriverException):
+        with pool.lease() as driver:
+            driver.alive = False
+            raise WebDriverException("session deleted")
+    with pool.lease() as driver:
+        assert driver is drivers[1]
+
+    assert drivers[0].quit_called
+    assert pool.stats == {"leases": 2, "sessions_created": 2, "sessions_recycled": 1}
+
+
+def test_session_that_died_while_idle_is_replaced():
+    pool, drivers = create_pool()
+    with pool.lease():
+        pass
+    drivers[0].alive = False
+    with pool.lease() as driver:
+        assert driver is drivers[1]
+
+    assert pool.stats["sessions_recycled"] == 1
+
+
+def test_shutdown_quits_every_session():
+    pool, drivers = create_pool(size=2)
+    with pool.lease(), pool.lease():
+        pass
+    pool.shutdown()
+
+    assert len(drivers) == 2
+    assert all(driver.quit_called for driver in drivers)
+    with pytest.raises(RuntimeError):
+        with pool.lease():
+            pass
+
+
+def test_lean_sessions_block_resources_and_count_requests():
+    pool, drivers = create_pool(lean=True)
+    with pool.lease() as driver:
+        events = [
+            {"method": "Network.loadingFinished", "params": {"encodedDataLength": 2048}},
+            {"method": "Network.loadingFailed", "params": {"blockedReason": "inspector"}},
+            {"method": "Network.loadingFailed", "params": {}},
+        ]
+        driver.log_entries = [{"message": json.dumps({"message": event})} for event in events]
+
+    assert ("Network.setBlockedURLs", {"urls": tpa.get_blocked_patterns()}) in drivers[0].cdp_commands
+    assert pool.stats["requests_loaded"] == 1
+    assert pool.stats["bytes_loaded"] == 2048
+    assert pool.stats["requests_blocked"] == 1
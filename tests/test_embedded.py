@@ -0,0 +1,25 @@
+#tests that the HTTP engine reads the listing data embedded as JSON in the results pages and follows the page cursor
+import requests
+
+import TravelPropertyAnalysis as tpa
+
+
+def test_embedded_pages(embedded_site):
+    with requests.Session() as session:
+        pages = list(tpa.iter_pages_http("Lisbon", embedded_site, session, max_pages=None))
+
+    assert pages == [
+        [
+            ("Riverside Apartm...", 4.87, 1203, 1120.0, "2001"),
+            ("Alfama Studio...", "", "", 75.0, "2002"),
+            ("Bairro Alto Loft...", 4.6, 54, 119.0, "2003"),
+        ],
+        [
+            ("Belém House...", 0, 0, 210.0, "2004"),
+            ("Graça Room...", 4.95, 2480, 60.0, "2005"),
+        ],
+    ]
+
+
+def test_rating_with_thousands_separator():
+    assert tpa.parse_rating_text("4.87 (1,203)") == (4.87, 1203)
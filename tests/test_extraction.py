@@ -0,0 +1,78 @@
+#tests that the batch and per-element paths read the same values from a saved results page
+import pytest
+
+import TravelPropertyAnalysis as tpa
+
+
+def test_batch_matches_per_element(results_driver):
+    batch_data = tpa.get_page_data_batch(results_driver)
+    per_element_data = tpa.get_page_data_per_element(results_driver, timeout=0)
+
+    assert batch_data == per_element_data
+
+
+def test_batch_values(results_driver):
+    assert tpa.get_page_data_batch(results_driver) == [
+        ("Seaside Cottage ...", 4.93, 128, 1234.0, "101"),
+        ("Loft...", "", "", 80.0, "103"),
+        ("Cabin in the Woo...", 0, 0, 150.0, "104"),
+        ("Flat...", 4.5, 12, 0, None),
+    ]
+
+
+def test_convert_cards_matches_field_parsers():
+    cards = [
+        ["Seaside Cottage with Garden View", "4.93 (128)", "£1,234 night", "/rooms/101"],
+        ["Loft", "New", "£80 night", "/rooms/103"],
+    ]
+    expected = [
+        (tpa.shorten_name(name), *tpa.convert_rating_review(*tpa.split_rating_review(rating)), tpa.parse_price_text(price), tpa.parse_listing_id(link))
+        for name, rating, price, link in cards
+    ]
+
+    assert tpa.convert_cards(cards) == expected
+
+
+def test_empty_name_is_skipped(results_driver):
+    assert tpa.get_property_name(results_driver, 2, timeout=0) == ""
+    assert tpa.convert_cards([["", "4.50 (10)", "£99 night", "/rooms/102"]]) == []
+
+
+def test_page_that_did_not_load_is_not_the_end(results_driver, monkeypatch):
+    monkeypatch.setattr(tpa, "wait_for_results", lambda driver: "timeout")
+
+    with pytest.raises(tpa.ScrapeFailedError):
+        list(tpa.iter_pages(results_driver, max_pages=None))
+
+
+def test_page_with_no_results_is_the_end(results_driver, monkeypatch):
+    monkeypatch.setattr(tpa, "wait_for_results", lambda driver: "empty")
+
+    assert list(tpa.iter_pages(results_driver, max_pages=None)) == []
+
+
+def test_card_script_arguments():
+    #the Python stand-in for CARD_SCRIPT in conftest.py unpacks the arguments in this order, so the script must read them the same way
+    assert "document.evaluate(arguments[0], document" in tpa.CARD_SCRIPT
+    assert 'document.evaluate("div", container' in tpa.CARD_SCRIPT
+    assert "cardText(card, arguments[1]), cardText(card, arguments[2]), cardText(card, arguments[3]), cardLink(card, arguments[5])" in tpa.CARD_SCRIPT
+    assert "i < arguments[4]" in tpa.CARD_SCRIPT
+
+    calls = []
+
+    class RecordingDriver:
+        def execute_script(self, script, *arguments):
+            calls.append(arguments)
+            return []
+
+    tpa.get_page_data_batch(RecordingDriver())
+    assert calls == [(tpa.RESULTS_PATH, tpa.NAME_SUBPATH, tpa.RATING_SUBPATH, tpa.PRICE_SUBPATH, tpa.RESULTS_PER_PAGE, tpa.LISTING_LINK_SUBPATH)]
+
+
+def test_results_are_waited_for_once(results_driver, monkeypatch):
+    waits = []
+    monkeypatch.setattr(tpa, "wait_for_results", lambda driver: waits.append(driver) or "ready")
+    monkeypatch.setattr(tpa, "get_element", None)
+
+    assert len(tpa.get_page_data(results_driver)) == 4
+    assert len(waits) == 1
@@ -0,0 +1,119 @@
+#tests of the searches run in the background of the GUI, using stand-ins for the Tk window and status label
+import threading
+from concurrent.futures import Future
+
+import matplotlib
+import matplotlib.pyplot as plt
+import pandas as pd
+import pytest
+
+import TravelPropertyAnalysis as tpa
+
+matplotlib.use("Agg")
+
+
+#stand-in for the Tk window that remembers the callbacks scheduled with after() instead of running them
+class StubWindow:
+    def __init__(self):
+        self.scheduled = []
+
+    def after(self, delay, callback):
+        self.scheduled.append((delay, callback))
+
+
+#stand-in for the status label that remembers every text it has shown
+class StubLabel:
+    def __init__(self):
+        self.texts = []
+
+    def config(self, text):
+        self.texts.append(text)
+
+
+@pytest.fixture
+def searches(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(tpa, "current_run", None)
+    searches = tpa.BackgroundSearches(StubWindow(), StubLabel(), engine="http")
+    yield searches
+    searches.shutdown()
+    plt.close("all")
+
+
+#function that returns a run_search stand-in that reports two pages of progress and returns property_df with its data already saved
+def make_run_search(property_df):
+    def run_search(travel_location, engine, progress, cancel_event):
+        progress(1, 2)
+        progress(2, len(property_df))
+        saved = Future()
+        saved.set_result(1)
+        return property_df, {"scrape": 0.5}, saved
+    return run_search
+
+
+def test_polling_is_scheduled(searches):
+    assert [delay for delay, callback in searches.window.scheduled] == [100]
+    searches.poll_updates()
+    assert [delay for delay, callback in searches.window.scheduled] == [100, 100]
+
+
+def test_progress_done_and_saved(searches, monkeypatch):
+    property_df = pd.DataFrame({"name": ["A...", "B...", "C..."], "average_rating": [4.5, "", 4.9], "number_of_ratings": [10, "", 3], "price_per_night": [50.0, 80.0, 65.0]})
+    monkeypatch.setattr(tpa, "run_search", make_run_search(property_df))
+    finished = []
+    monkeypatch.setattr(tpa, "finish_run", finished.append)
+
+    searches.search("Paris", threading.Event())
+    #the next search has started by the time the graphs of this one are drawn
+    other_run = tpa.start_run("Rome")
+    searches.poll_updates()
+
+    #the elapsed time at the end of each text is left out
+    texts = [text.rsplit(" ", 1)[0] for text in searches.status_label.texts]
+    assert texts == ["Paris: page 1, 0 properties,", "Paris: page 1, 2 properties,", "Paris: page 2, 3 properties,", "Paris: 3 properties found in"]
+    run = finished[0]
+    assert run.label == "Paris"
+    assert run.stages["analyse"]["calls"] == 1
+    assert "analyse" not in other_run.stages
+
+
+def test_failed_search(searches, monkeypatch):
+    def run_search(travel_location, engine, progress, cancel_event):
+        raise tpa.NoResultsError(f"No properties were found for {travel_location}")
+
+    monkeypatch.setattr(tpa, "run_search", run_search)
+    monkeypatch.setattr(tpa, "finish_run", lambda run: None)
+
+    searches.search("Nowhere", threading.Event())
+    searches.poll_updates()
+
+    assert searches.status_label.texts[-1] == "Nowhere: search failed - No properties were found for Nowhere"
+
+
+def test_cancel_running_and_queued_searches(searches, monkeypatch):
+    started = threading.Event()
+
+    def run_search(travel_location, engine, progress, cancel_event):
+        started.set()
+        cancel_event.wait(5)
+        raise tpa.SearchCancelled()
+
+    monkeypatch.setattr(tpa, "run_search", run_search)
+    monkeypatch.setattr(tpa, "finish_run", lambda run: None)
+
+    searches.submit("Paris")
+    searches.submit("Rome")
+    searches.submit("   ")
+    assert started.wait(5)
+    searches.cancel_all()
+    searches.searches[0][1].result(timeout=5)
+    searches.poll_updates()
+
+    texts = searches.status_label.texts
+    assert texts[0] == "Cancelling searches..."
+    assert "Paris: queued (1 search(es) waiting or running)" in texts
+    assert "Rome: queued (2 search(es) waiting or running)" in texts
+    #the search that was waiting is cancelled before it starts, so it never reports any progress
+    assert not any(text.startswith("Rome: page") for text in texts)
+    assert texts[-2:] in (["Rome: search cancelled", "Paris: search cancelled"], ["Paris: search cancelled", "Rome: search cancelled"])
+    assert searches.searches == []
@@ -0,0 +1,38 @@
+#tests of the lean browser profile's blocked URL patterns against the resources of the benchmark's fixture pages
+from fnmatch import fnmatchcase
+
+import PropertyBenchmark
+import TravelPropertyAnalysis as tpa
+
+
+#function that returns True if a URL matches one of the patterns, where "*" matches any text as it does for Network.setBlockedURLs
+def is_blocked(url, patterns):
+    return any(fnmatchcase(url, pattern) for pattern in patterns)
+
+
+def test_fixture_resources_are_blocked():
+    site = PropertyBenchmark.FixtureSite(pages=1, cards=3)
+    try:
+        page = PropertyBenchmark.create_results_page("Paris", 1, 1, 3)
+        patterns = tpa.get_blocked_patterns()
+        for path in ("/assets/listing-1.jpg", "/assets/promo.mp4", "/assets/fixture-sans.woff2", "/assets/www.googletagmanager.com/gtm.js"):
+            assert path in page or path in PropertyBenchmark.STYLESHEET
+            assert is_blocked(site.url + path, patterns)
+        for path in ("/s/Paris/homes", "/assets/site.css", "/rooms/1"):
+            assert not is_blocked(site.url + path, patterns)
+    finally:
+        site.server.server_close()
+
+
+def test_allow_listed_image_pattern_is_not_blocked():
+    patterns = tpa.get_blocked_patterns(("*.svg*",))
+
+    assert not is_blocked("https://a0.muscache.com/logo.svg", patterns)
+    assert is_blocked("https://a0.muscache.com/im/pictures/1.jpg", patterns)
+
+
+def test_images_are_blocked_by_pattern_not_by_turning_them_off():
+    options = tpa.create_driver_options(lean=True)
+
+    assert "prefs" not in options.experimental_options
+    assert is_blocked("https://a0.muscache.com/im/pictures/1.jpg", tpa.get_blocked_patterns())
@@ -0,0 +1,17 @@
+#tests of the stages of a search run from the GUI
+import TravelPropertyAnalysis as tpa
+
+
+def test_search_saved_to_database_is_not_read_back(embedded_site, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    filename = str(tmp_path / "store.db")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(tpa, "load_scrape", None)
+        property_df, timings, saved = tpa.run_search("Lisbon", "http", storage="sqlite", max_pages=None, base_url=embedded_site, filename=filename)
+
+    assert list(property_df["listing_id"]) == ["2001", "2002", "2003", "2004", "2005"]
+    assert set(timings) == {"scrape", "dataframe", "persist"}
+    assert timings["persist"] > 0
+    assert list(tpa.load_location("Lisbon", filename)["listing_id"]) == list(property_df["listing_id"])
+    assert saved.result() == tpa.get_latest_scrape_id("Lisbon", filename)
@@ -0,0 +1,33 @@
+#tests of the run reports
+import threading
+from types import SimpleNamespace
+
+import TravelPropertyAnalysis as tpa
+
+
+def test_report_only_counts_the_run():
+    tpa.count_cache("misses")
+    pool = SimpleNamespace(stats={"leases": 3, "requests_blocked": 10})
+    run = tpa.RunProfile("test")
+    run.attach_pool(pool)
+
+    tpa.count_cache("misses")
+    pool.stats = {"leases": 5, "requests_blocked": 14}
+    report = run.report()
+
+    assert report["cache"]["misses"] == 1
+    assert report["driver_pool"] == {"leases": 2, "requests_blocked": 4}
+
+
+def test_worker_threads_are_profiled():
+    run = tpa.RunProfile("test", cprofile=True)
+
+    def work():
+        return sum(number * number for number in range(1000))
+
+    thread = threading.Thread(target=run.profile_thread, args=(work,))
+    thread.start()
+    thread.join()
+    run.stop_profiler()
+
+    assert any(function == "work" for filename, line, function in run.profile_stats.stats)
@@ -0,0 +1,115 @@
+#tests of the retries, backoff and circuit breaker used when the website fails or blocks searches
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+import requests
+
+import TravelPropertyAnalysis as tpa
+from conftest import read_fixture
+
+
+#a local HTTP server that answers each request with the next status in statuses, then with the saved results page once they run out
+@pytest.fixture
+def flaky_site():
+    site = {"statuses": [], "requests": 0}
+    page = read_fixture("embedded_page_2.html").encode("utf-8")
+
+    class FlakyHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            site["requests"] += 1
+            if site["statuses"] != []:
+                self.send_error(site["statuses"].pop(0))
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(page)))
+            self.end_headers()
+            self.wfile.write(page)
+
+        def log_message(self, format, *arguments):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FlakyHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    site["url"] = f"http://127.0.0.1:{server.server_port}"
+    yield site
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def quick_retries(monkeypatch, tmp_path):
+    monkeypatch.setattr(tpa, "RETRY_BASE_DELAY", 0.01)
+    monkeypatch.setattr(tpa, "circuit_breakers", {})
+    monkeypatch.chdir(tmp_path)
+
+
+def test_backoff_doubles_up_to_the_limit(monkeypatch):
+    delays = []
+    monkeypatch.setattr(tpa.random, "uniform", lambda low, high: high)
+    monkeypatch.setattr(tpa.time, "sleep", delays.append)
+    monkeypatch.setattr(tpa, "RETRY_BASE_DELAY", 2)
+    monkeypatch.setattr(tpa, "RETRY_MAX_DELAY", 10)
+
+    for attempt in range(1, 5):
+        tpa.backoff_sleep(attempt)
+
+    assert delays == [2, 4, 8, 10]
+
+
+def test_backoff_stops_when_cancelled():
+    cancel_event = threading.Event()
+    cancel_event.set()
+    start_time = time.perf_counter()
+
+    with pytest.raises(tpa.SearchCancelled):
+        tpa.backoff_sleep(1, cancel_event)
+    assert time.perf_counter() - start_time < 1
+
+
+def test_busy_server_is_retried(flaky_site):
+    flaky_site["statuses"] = [429, 503]
+
+    with requests.Session() as session:
+        response = tpa.fetch_page(session, flaky_site["url"])
+
+    assert response.status_code == 200
+    assert flaky_site["requests"] == 3
+
+
+def test_retries_are_bounded(flaky_site):
+    flaky_site["statuses"] = [500] * 10
+
+    with requests.Session() as session, pytest.raises(tpa.ScrapeFailedError):
+        tpa.fetch_page(session, flaky_site["url"])
+    assert flaky_site["requests"] == tpa.RETRY_ATTEMPTS
+
+
+def test_circuit_opens_and_cools_down(flaky_site, monkeypatch):
+    flaky_site["statuses"] = [503] * (tpa.RETRY_ATTEMPTS * tpa.CIRCUIT_FAILURE_LIMIT)
+    for _ in range(tpa.CIRCUIT_FAILURE_LIMIT):
+        with pytest.raises(tpa.ScrapeFailedError):
+            list(tpa.stream_search("Lisbon", "http", flaky_site["url"], force_refresh=True))
+
+    #once open, searches for the location fail straight away without visiting the website
+    requests_made = flaky_site["requests"]
+    with pytest.raises(tpa.CircuitOpenError):
+        list(tpa.stream_search("Lisbon", "http", flaky_site["url"], force_refresh=True))
+    assert flaky_site["requests"] == requests_made
+    #other locations are not stopped
+    assert len(list(tpa.stream_search("Porto", "http", flaky_site["url"], force_refresh=True))) == 1
+
+    #after the cooldown a search is let through, and succeeding closes the circuit
+    monkeypatch.setattr(tpa, "CIRCUIT_COOLDOWN", 0)
+    assert len(list(tpa.stream_search("Lisbon", "http", flaky_site["url"], force_refresh=True))) == 1
+    assert tpa.circuit_breakers == {}
+
+
+def test_last_page_does_not_wait_for_the_next_page_button(results_driver, monkeypatch):
+    monkeypatch.setattr(tpa, "READY_ELEMENT_TIMEOUT", 0)
+    start_time = time.perf_counter()
+
+    assert not tpa.next_page(results_driver)
+    assert time.perf_counter() - start_time < 1
@@ -0,0 +1,72 @@
+#tests of saving scrapes to the database and exporting them
+import sqlite3
+
+import PropertyAnalytics
+import TravelPropertyAnalysis as tpa
+
+
+def test_export_without_locations(tmp_path):
+    excel_filename = tmp_path / "export.xlsx"
+
+    assert tpa.export_excel(str(excel_filename), str(tmp_path / "empty.db")) is None
+    assert tpa.export_excel(str(excel_filename), str(tmp_path / "empty.db"), []) is None
+    assert not excel_filename.exists()
+
+
+def test_only_changed_still_stores_every_listing(tmp_path):
+    filename = str(tmp_path / "store.db")
+    page_data = [("A...", 4.5, 10, 50.0, "1"), ("B...", 4.8, 20, 80.0, "2")]
+
+    connection = tpa.open_store(filename)
+    try:
+        first_scrape = tpa.start_scrape(connection, "Paris")
+        assert tpa.append_properties(connection, first_scrape, page_data, only_changed=True) == page_data
+        second_scrape = tpa.start_scrape(connection, "Paris")
+        changed = [("B...", 4.8, 21, 80.0, "2"), ("C...", "", "", 60.0, "3")]
+        assert tpa.append_properties(connection, second_scrape, page_data[:1] + changed, only_changed=True) == changed
+    finally:
+        connection.close()
+
+    assert list(tpa.load_location("Paris", filename)["listing_id"]) == ["1", "2", "3"]
+
+
+def test_churn_of_scrapes_saved_in_the_same_second(tmp_path):
+    filename = str(tmp_path / "store.db")
+    for listing_ids in (["1", "2", "3"], ["2", "3", "4"], ["2", "3", "4"]):
+        data = {"name": [f"{listing_id}..." for listing_id in listing_ids], "average_rating": [4.5] * 3, "number_of_ratings": [10] * 3,
+                "price_per_night": [50.0] * 3, "listing_id": listing_ids}
+        tpa.save_scrape(data, "Paris", filename, scraped_at="2026-01-01T00:00:00+00:00")
+
+    trend = PropertyAnalytics.get_location_trend("Paris", filename)
+    assert list(trend["new_listings"]) == [3, 1, 0]
+    assert list(trend["gone_listings"].fillna(-1)) == [-1, 1, 0]
+
+
+def test_cached_search_is_not_a_new_scrape(embedded_site, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    filename = str(tmp_path / "store.db")
+
+    scrape_id, stats = tpa.crawl_location("Lisbon", "http", embedded_site, filename=filename)
+    cached_scrape_id, cached_stats = tpa.crawl_location("Lisbon", "http", embedded_site, filename=filename)
+
+    assert cached_scrape_id == scrape_id
+    assert cached_stats["properties"] == stats["properties"] == 5
+    with sqlite3.connect(filename) as connection:
+        assert connection.execute("SELECT COUNT(*) FROM scrapes").fetchone()[0] == 1
+        assert connection.execute("SELECT scrapes, properties_total FROM location_summaries").fetchone() == (1, 5)
+
+
+def test_cached_search_is_stored_in_a_database_without_it(embedded_site, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    filename = str(tmp_path / "B.db")
+    data = {"name": ["Old..."], "average_rating": [4.0], "number_of_ratings": [1], "price_per_night": [40.0], "listing_id": ["1"]}
+    old_scrape_id = tpa.save_scrape(data, "Lisbon", filename, scraped_at="2025-01-01T00:00:00+00:00")
+
+    tpa.crawl_location("Lisbon", "http", embedded_site, filename=str(tmp_path / "A.db"))
+    scrape_id, stats = tpa.crawl_location("Lisbon", "http", embedded_site, filename=filename)
+
+    assert scrape_id != old_scrape_id
+    assert stats["properties"] == 5
+    assert len(tpa.load_location("Lisbon", filename)) == 5
+    #the scrape stored from the cache is used by the next search saved to the same database
+    assert tpa.crawl_location("Lisbon", "http", embedded_site, filename=filename)[0] == scrape_id